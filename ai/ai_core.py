@@ -1,17 +1,24 @@
 from ai.tx_audit import TxAuditAI
 from ai.bot_detection import BotDetectorAI
-from ai.fee_model import FeeAI
+from ai.fee_model import FeePredictor
 from ai.block_filter import BlockFilterAI
+from ai.tx_batch import TransactionBatch
 
 class AstraAI:
     def __init__(self):
         self.audit = TxAuditAI()
         self.bot = BotDetectorAI()
-        self.fee = FeeAI()
+        self.fee = FeePredictor()
         self.filter = BlockFilterAI()
     
     def analyze_block(self, txs):
-        risks = [self.audit.risk_score(tx) for tx in txs]
-        avg_risk = sum(risks) / len(risks) if risks else 0
-        bot = self.bot.is_bot(txs)
+        """(average risk, bot flag); only callers passing an existing TransactionBatch skip its build cost"""
+        if not isinstance(txs, TransactionBatch):
+            txs = TransactionBatch.from_transactions(txs)
+        return self.analyze_batch(txs)
+    
+    def analyze_batch(self, batch):
+        risks = self.audit.risk_scores(batch)
+        avg_risk = float(risks.mean()) if len(risks) else 0
+        bot = self.bot.is_bot_batch(batch)
         return avg_risk, bot
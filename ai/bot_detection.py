@@ -1,4 +1,12 @@
+import numpy as np
+
 class BotDetectorAI:
     def is_bot(self, tx_list):
         senders = [tx.sender for tx in tx_list]
         return len(senders) != len(set(senders))
+    
+    def is_bot_batch(self, batch):
+        """Vectorized is_bot: any sender appearing more than once"""
+        if len(batch) == 0:
+            return False
+        return bool(np.bincount(batch.sender_ids).max() > 1)
@@ -1,39 +1,51 @@
+import threading
+
 from flask import Flask, request, jsonify
 from core.transaction import Transaction
-from core.mempool import Mempool
+from core.priority_mempool import PriorityMempool
+from core.block_template import BlockTemplateBuilder
 from core.chain import Blockchain
 from ai.ai_core import AstraAI
 
 app = Flask(__name__)
 
-mempool = Mempool()
+mempool = PriorityMempool(verbose=False)
+block_template = BlockTemplateBuilder(mempool)
 chain = Blockchain()
 ai = AstraAI()
+# Flask serves requests on several threads; the mempool, its template
+# builder and the chain are not thread-safe, so every handler holds this
+node_lock = threading.Lock()
 
 @app.route("/send_tx", methods=["POST"])
 def send_tx():
     data = request.json
     tx = Transaction(data["sender"], data["receiver"], data["amount"])
-    mempool.add_tx(tx)
+    with node_lock:
+        mempool.add_tx(tx, fee=data.get("fee", 0))
     return jsonify({"tx_id": tx.tx_id, "status": "added"})
 
 @app.route("/mine", methods=["POST"])
 def mine():
-    if not mempool.transactions:
-        return jsonify({"error": "No transactions"}), 400
-    risk, bot = ai.analyze_block(mempool.transactions)
-    if not bot and ai.filter.approve_block(risk):
-        chain.add_block(mempool.transactions)
-        mempool.clear()
-        return jsonify({"status": "Block mined", "risk": risk})
+    with node_lock:
+        if not len(mempool):
+            return jsonify({"error": "No transactions"}), 400
+        txs = block_template.get_template()
+        risk, bot = ai.analyze_block(txs)
+        if not bot and ai.filter.approve_block(risk):
+            chain.add_block(txs)
+            mempool.remove_confirmed(txs)
+            return jsonify({"status": "Block mined", "risk": risk})
     return jsonify({"status": "Block rejected", "risk": risk, "bot_detected": bot})
 
 @app.route("/status", methods=["GET"])
 def status():
-    return jsonify({
-        "chain_length": len(chain.chain),
-        "mempool_size": len(mempool.transactions)
-    })
+    with node_lock:
+        return jsonify({
+            "chain_length": len(chain.chain),
+            "mempool_size": len(mempool),
+            "block_size_limit": block_template.limit
+        })
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
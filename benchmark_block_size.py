@@ -0,0 +1,124 @@
+# benchmark_block_size.py
+"""
+Replay of recorded arrival traces against the block sizing policies.
+
+Each trace is a list of transaction arrival times (seconds). Blocks are
+produced every BLOCK_INTERVAL seconds; the policy picks the size from the
+mempool at that moment and the block takes the oldest pending
+transactions. The inclusion latency of a transaction is the time from its
+arrival to the block that includes it.
+
+    python benchmark_block_size.py [trace.json ...]
+
+A trace file holds a JSON list of arrival times. Without arguments three
+synthetic traces (steady, bursty, ramp) are replayed.
+"""
+import sys
+import os
+import json
+import math
+import random
+from collections import deque
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.dynamic_block import DynamicBlockSize, LatencyTargetBlockSize
+from consensus.block_size_limit import block_size_limit
+
+BLOCK_INTERVAL = 10.0
+MIN_SIZE, MAX_SIZE = 1, 10
+
+class ReplayMempool:
+    """FIFO of arrival times with the views the policies read"""
+    def __init__(self):
+        self.pending = deque()
+        self.added = 0
+
+    @property
+    def transactions(self):
+        return self.pending
+
+    def __len__(self):
+        return len(self.pending)
+
+def steady_trace(blocks=2000, rate=0.5, seed=1):
+    rng = random.Random(seed)
+    t, arrivals = 0.0, []
+    while t < blocks * BLOCK_INTERVAL:
+        t += rng.expovariate(rate)
+        arrivals.append(t)
+    return arrivals
+
+def bursty_trace(blocks=2000, rate=0.3, burst=60, every=40, seed=2):
+    arrivals = steady_trace(blocks, rate, seed)
+    rng = random.Random(seed)
+    for start in range(0, blocks, every):
+        base = start * BLOCK_INTERVAL + rng.random() * BLOCK_INTERVAL
+        arrivals += [base + rng.random() * 2 for _ in range(burst)]
+    return sorted(arrivals)
+
+def ramp_trace(blocks=2000, peak=0.9, seed=3):
+    rng = random.Random(seed)
+    t, arrivals, end = 0.0, [], blocks * BLOCK_INTERVAL
+    while t < end:
+        rate = 0.05 + peak * (t / end)
+        t += rng.expovariate(rate)
+        arrivals.append(t)
+    return arrivals
+
+def replay(arrivals, choose_size):
+    """Inclusion latency of every transaction that made it into a block"""
+    mempool = ReplayMempool()
+    latencies = []
+    next_arrival = 0
+    block_time = BLOCK_INTERVAL
+    end = arrivals[-1] + BLOCK_INTERVAL * 50 if arrivals else 0
+    while block_time <= end and (next_arrival < len(arrivals) or mempool.pending):
+        while next_arrival < len(arrivals) and arrivals[next_arrival] <= block_time:
+            mempool.pending.append(arrivals[next_arrival])
+            mempool.added += 1
+            next_arrival += 1
+        size = choose_size(mempool, block_time)
+        for _ in range(min(size, len(mempool.pending))):
+            latencies.append(block_time - mempool.pending.popleft())
+        block_time += BLOCK_INTERVAL
+    return latencies
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1]
+
+def policies():
+    step = DynamicBlockSize(MIN_SIZE, MAX_SIZE)
+    controller = LatencyTargetBlockSize(MIN_SIZE, MAX_SIZE, target_latency=30.0,
+                                        block_interval=BLOCK_INTERVAL)
+    return {
+        "DynamicBlockSize (step)": lambda mempool, now: step.calculate_block_size(mempool),
+        "block_size_limit (step)": lambda mempool, now: max(MIN_SIZE, min(MAX_SIZE, block_size_limit(mempool))),
+        "LatencyTargetBlockSize": lambda mempool, now: controller.calculate_block_size(mempool, now=now),
+    }
+
+def run_benchmark(traces):
+    results = {}
+    for name, arrivals in traces.items():
+        print("="*72)
+        print(f"TRACE {name}: {len(arrivals):,} txs over {arrivals[-1] / BLOCK_INTERVAL:,.0f} blocks")
+        print("="*72)
+        print(f"{'policy':<26} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (seconds)")
+        for policy, choose_size in policies().items():
+            latencies = replay(arrivals, choose_size)
+            row = [percentile(latencies, q) for q in (50, 95, 99, 100)]
+            results[(name, policy)] = row
+            print(f"{policy:<26} " + " ".join(f"{value:>8.1f}" for value in row))
+        print()
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        traces = {}
+        for path in sys.argv[1:]:
+            with open(path) as f:
+                traces[os.path.basename(path)] = sorted(json.load(f))
+    else:
+        traces = {"steady": steady_trace(), "bursty": bursty_trace(), "ramp": ramp_trace()}
+    run_benchmark(traces)
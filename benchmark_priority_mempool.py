@@ -0,0 +1,127 @@
+# benchmark_priority_mempool.py
+"""
+Admission rate of PriorityMempool while it fills up and once it is full.
+
+Every admission into a full pool evicts the lowest priority transaction,
+so a flat rate across all windows means eviction stays O(log n). The churn
+run mixes confirmed-block removals, fee bumps and arrivals, and shows the
+heap staying bounded while tombstones are compacted.
+"""
+import sys
+import os
+import random
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.priority_mempool import PriorityMempool
+
+class BenchTx:
+    def __init__(self, tx_id):
+        self.tx_id = tx_id
+
+def run_benchmark(max_size=100000, total=200000, window=10000):
+    print("="*60)
+    print(f"PRIORITY MEMPOOL ADMISSION BENCHMARK (max_size={max_size:,})")
+    print("="*60)
+    
+    rng = random.Random(42)
+    mempool = PriorityMempool(max_size=max_size, verbose=False)
+    txs = [(BenchTx(f"tx_{i}"), rng.random(), rng.random() * 5) for i in range(total)]
+    
+    rates = []
+    full_rates = []
+    for start in range(0, total, window):
+        began = time.perf_counter()
+        for tx, ai_score, fee in txs[start:start + window]:
+            mempool.add_tx(tx, ai_score, fee)
+        elapsed = time.perf_counter() - began
+        rates.append(window / elapsed)
+        state = "full" if len(mempool) >= max_size else "filling"
+        if state == "full" and start >= max_size:
+            full_rates.append(rates[-1])
+        print(f"{start + window:>8,} txs | pool {len(mempool):>8,} ({state:7}) | {rates[-1]:>10,.0f} tx/s")
+    
+    began = time.perf_counter()
+    top = mempool.get_next_transactions(1000)
+    print(f"\nTop 1,000 selection: {(time.perf_counter() - began) * 1000:.1f} ms")
+    if full_rates:
+        print(f"Full pool, last/first window rate: {full_rates[-1] / full_rates[0]:.2f}")
+    return rates
+
+def run_churn_benchmark(max_size=100000, rounds=20, batch=5000):
+    """
+    Steady state churn: every round a block confirms `batch` pending txs,
+    a tenth of the rest get fee bumps, and `batch` new txs arrive.
+    """
+    print("\n" + "="*60)
+    print(f"PRIORITY MEMPOOL CHURN BENCHMARK (max_size={max_size:,})")
+    print("="*60)
+    
+    rng = random.Random(7)
+    mempool = PriorityMempool(max_size=max_size, verbose=False)
+    next_id = 0
+    for _ in range(max_size):
+        mempool.add_tx(BenchTx(f"tx_{next_id}"), rng.random(), rng.random() * 5)
+        next_id += 1
+    
+    rates = []
+    total_ops, total_time = 0, 0.0
+    for round_no in range(rounds):
+        pending = list(mempool.tx_map.values())
+        confirmed = [ptx.tx for ptx in rng.sample(pending, batch)]
+        bumped = rng.sample(pending, batch // 10)
+        
+        began = time.perf_counter()
+        mempool.remove_confirmed(confirmed)
+        for ptx in bumped:
+            if not ptx.removed:
+                mempool.add_tx(ptx.tx, ptx.ai_score, ptx.fee * 1.5)
+        for _ in range(batch):
+            mempool.add_tx(BenchTx(f"tx_{next_id}"), rng.random(), rng.random() * 5)
+            next_id += 1
+        elapsed = time.perf_counter() - began
+        
+        ops = batch * 2 + len(bumped)
+        total_ops += ops
+        total_time += elapsed
+        rates.append(ops / elapsed)
+        print(f"round {round_no + 1:>3} | heap {len(mempool.heap):>8,} | tombstones {mempool.tombstones:>6,} | {rates[-1]:>10,.0f} ops/s")
+    
+    print(f"\nHeap entries per live tx: {len(mempool.heap) / len(mempool):.2f}")
+    print(f"Overall (compactions included): {total_ops / total_time:,.0f} ops/s")
+    return rates
+
+def run_rescore_benchmark(max_size=100000):
+    """New AI scores for every pending tx: one rescore() against remove-and-insert per tx"""
+    print("\n" + "="*60)
+    print(f"PRIORITY MEMPOOL RESCORE BENCHMARK (max_size={max_size:,})")
+    print("="*60)
+    
+    rng = random.Random(11)
+    mempool = PriorityMempool(max_size=max_size, verbose=False)
+    for i in range(max_size):
+        mempool.add_tx(BenchTx(f"tx_{i}"), rng.random(), rng.random() * 5)
+    scores = {tx_id: rng.random() for tx_id in mempool.tx_map}
+    
+    began = time.perf_counter()
+    mempool.rescore(scores)
+    bulk = time.perf_counter() - began
+    print(f"rescore():            {bulk * 1000:>8.1f} ms")
+    
+    began = time.perf_counter()
+    for tx_id, score in scores.items():
+        ptx = mempool.tx_map[tx_id]
+        mempool.heap.remove(ptx)
+        ptx.ai_score = score
+        ptx.priority_score = ptx.calculate_priority(mempool.ai_weight, mempool.fee_weight)
+        mempool.heap.push(ptx)
+    single = time.perf_counter() - began
+    print(f"remove + insert each: {single * 1000:>8.1f} ms")
+    print(f"Speedup: {single / bulk:.1f}x")
+    return bulk, single
+
+if __name__ == "__main__":
+    run_benchmark()
+    run_churn_benchmark()
+    run_rescore_benchmark()
@@ -0,0 +1,98 @@
+# benchmark_snapshot.py
+"""
+Snapshot and restore time of BlockchainSnapshot per codec and thread count.
+
+    python benchmark_snapshot.py [blocks]
+
+"gzip" is the old single-stream .pkl.gz; "zlib" and "lzma" use the
+chunked container, compressed and decompressed in a thread pool. The last
+table compares reading one block from the middle of a random-access
+archive with a full restore.
+"""
+import sys
+import os
+import io
+import time
+import shutil
+import contextlib
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.snapshot import BlockchainSnapshot
+
+SNAPSHOT_DIR = "benchmark_snapshots"
+
+def make_chain(blocks):
+    return [
+        {
+            "index": i,
+            "hash": f"{i:064x}",
+            "previous_hash": f"{i - 1:064x}",
+            "transactions": [
+                {"id": f"tx_{i}_{j}", "sender": f"addr_{(i * 7 + j) % 997}",
+                 "receiver": f"addr_{(i * 13 + j) % 991}", "amount": (i * j) % 1000}
+                for j in range(20)
+            ]
+        }
+        for i in range(blocks)
+    ]
+
+def measure(chain, codec, workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = BlockchainSnapshot(SNAPSHOT_DIR, codec=codec, workers=workers)
+        began = time.perf_counter()
+        snapshot = manager.create_snapshot(chain, delta=False)
+        created = time.perf_counter() - began
+        began = time.perf_counter()
+        loaded = manager.load_snapshot(snapshot["id"])
+        restored = time.perf_counter() - began
+        size = os.path.getsize(manager._find_file(snapshot["id"]))
+        manager.delete_snapshot(snapshot["id"])
+    assert len(loaded["blockchain_data"]) == len(chain)
+    return created, restored, size
+
+def measure_random_access(chain, codec):
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = BlockchainSnapshot(SNAPSHOT_DIR, codec=codec, random_access=True)
+        began = time.perf_counter()
+        snapshot = manager.create_snapshot(chain, compress=bool(codec), delta=False)
+        created = time.perf_counter() - began
+        began = time.perf_counter()
+        with manager.open_snapshot(snapshot["id"]) as view:
+            block = view[len(chain) // 2]
+        fetched = time.perf_counter() - began
+        began = time.perf_counter()
+        manager.load_snapshot(snapshot["id"])
+        restored = time.perf_counter() - began
+        size = os.path.getsize(manager._find_file(snapshot["id"]))
+        manager.delete_snapshot(snapshot["id"])
+    assert block == chain[len(chain) // 2]
+    return created, fetched, restored, size
+
+def run_benchmark(blocks=50000):
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        chain = make_chain(blocks)
+    cpus = os.cpu_count() or 1
+    thread_counts = sorted({1, 2, 4, cpus})
+    print("="*64)
+    print(f"SNAPSHOT BENCHMARK: {blocks:,} blocks, {cpus} CPU(s)")
+    print("="*64)
+    print(f"{'codec':<6} {'threads':>7} {'create':>9} {'restore':>9} {'size':>10}")
+    results = {}
+    for codec in ("gzip", "zlib", "lzma"):
+        for workers in ([1] if codec == "gzip" else thread_counts):
+            created, restored, size = measure(chain, codec, workers)
+            results[(codec, workers)] = (created, restored, size)
+            print(f"{codec:<6} {workers:>7} {created:>8.2f}s {restored:>8.2f}s {size / 1e6:>8.1f}MB")
+    print()
+    print(f"{'archive':<7} {'create':>8} {'block N':>9} {'restore':>9} {'size':>10}")
+    for codec in (None, "zlib"):
+        created, fetched, restored, size = measure_random_access(chain, codec)
+        results[("archive", codec)] = (created, fetched, restored, size)
+        print(f"{codec or 'none':<7} {created:>7.2f}s {fetched * 1000:>7.2f}ms {restored:>8.2f}s {size / 1e6:>8.1f}MB")
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+    return results
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -4,9 +4,11 @@ def block_size_limit(mempool):
     """
     Големината на блокот се менува според мемпул.
     """
-    if len(mempool.transactions) < 10:
+    # len() на мемпулот наместо копија од сите трансакции
+    count = len(mempool) if hasattr(mempool, '__len__') else len(mempool.transactions)
+    if count < 10:
         return 2
-    elif len(mempool.transactions) < 50:
+    elif count < 50:
         return 5
     return 10
 
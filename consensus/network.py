@@ -1,8 +1,18 @@
 import socket
+import struct
 import threading
 
+from core.codec import decode_block, decode_transaction, encode_block, encode_transaction
+
 nodes = []
 
+# Binary messages: 4-byte length, 1-byte type, core.codec payload
+FRAME = struct.Struct(">IB")
+MSG_TX = 1
+MSG_BLOCK = 2
+# Largest payload accepted from a peer; the length prefix is untrusted
+MAX_FRAME = 32 * 1024 * 1024
+
 def connect_node(ip, port):
     s = socket.socket()
     s.connect((ip, port))
@@ -12,6 +22,43 @@ def broadcast_tx(tx_data):
     for node in nodes:
         node.send(tx_data.encode())
 
+def send_message(sock, msg_type, payload):
+    sock.sendall(FRAME.pack(len(payload), msg_type) + payload)
+
+def broadcast_transaction(tx):
+    payload = encode_transaction(tx)
+    for node in nodes:
+        send_message(node, MSG_TX, payload)
+
+def broadcast_block(block):
+    payload = encode_block(block)
+    for node in nodes:
+        send_message(node, MSG_BLOCK, payload)
+
+def _recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Connection closed")
+        received += n
+    return buf
+
+def receive_message(sock):
+    """Read one binary message; returns (type, Transaction or Block)"""
+    length, msg_type = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    if length > MAX_FRAME:
+        sock.close()
+        raise ConnectionError(f"Frame of {length} bytes exceeds MAX_FRAME, connection dropped")
+    payload = memoryview(_recv_exact(sock, length))
+    if msg_type == MSG_TX:
+        return msg_type, decode_transaction(payload)
+    if msg_type == MSG_BLOCK:
+        return msg_type, decode_block(payload)
+    raise ValueError(f"Unknown message type {msg_type}")
+
 def start_server(port):
     s = socket.socket()
     s.bind(("", port))
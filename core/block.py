@@ -1,5 +1,6 @@
-import hashlib
 import time
+from core.header import BlockHeader
+from core.merkle import merkle_root
 
 class Block:
     def __init__(self, index, transactions, prev_hash):
@@ -7,8 +8,11 @@ class Block:
         self.transactions = transactions
         self.prev_hash = prev_hash
         self.timestamp = time.time()
+        self.merkle_root = merkle_root(transactions)
         self.hash = self.calculate_hash()
 
+    def header(self):
+        return BlockHeader(self.prev_hash, self.merkle_root, self.timestamp)
+
     def calculate_hash(self):
-        raw = f"{self.index}{self.transactions}{self.prev_hash}{self.timestamp}"
-        return hashlib.sha256(raw.encode()).hexdigest()
+        return self.header().hash()
@@ -0,0 +1,267 @@
+# core/block_store.py
+
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+from core.codec import decode_block, encode_block
+
+INDEX_MAGIC = b"ASTX"
+INDEX_VERSION = 2  # 1 = pickled records, 2 = core.codec records
+# magic, version, block count
+INDEX_HEADER = struct.Struct(">4sIQ")
+# segment number, offset in segment, record length
+INDEX_ENTRY = struct.Struct(">IQI")
+INDEX_GROWTH = 65536  # entries added each time the index file is extended
+
+
+class BlockStore:
+    """
+    Append-only, disk-backed block storage
+
+    Blocks are appended to segment files (blk00000.dat, blk00001.dat, ...)
+    and located through a fixed-width offset index that is memory-mapped,
+    so block N is one index read plus one segment read. Only the most
+    recently used blocks are kept in memory.
+
+    The store behaves like a list of blocks (len, [height], [-1], slicing,
+    iteration, append), so it can replace Blockchain.chain directly.
+    """
+
+    def __init__(self, directory="blocks", cache_size=1024, segment_size=128 * 1024 * 1024):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.segment_size = segment_size
+        self.cache = OrderedDict()
+        self._readers = {}
+        os.makedirs(directory, exist_ok=True)
+
+        self._open_index()
+        self._open_active_segment()
+        print(f"[BLOCKSTORE] {directory}: {self.count} blocks")
+
+    # Index ------------------------------------------------------------
+
+    def _open_index(self):
+        path = os.path.join(self.directory, "blocks.idx")
+        new = not os.path.exists(path)
+        self._index_file = open(path, "a+b")
+        if new:
+            self._index_file.truncate(INDEX_HEADER.size + INDEX_GROWTH * INDEX_ENTRY.size)
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0)
+        if new:
+            INDEX_HEADER.pack_into(self._index_map, 0, INDEX_MAGIC, INDEX_VERSION, 0)
+
+        magic, version, self.count = INDEX_HEADER.unpack_from(self._index_map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{path} is not a block index")
+
+    def _index_capacity(self):
+        return (len(self._index_map) - INDEX_HEADER.size) // INDEX_ENTRY.size
+
+    def _grow_index(self):
+        size = len(self._index_map) + INDEX_GROWTH * INDEX_ENTRY.size
+        self._index_map.flush()
+        self._index_map.close()
+        self._index_file.truncate(size)
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0)
+
+    def _entry(self, height):
+        return INDEX_ENTRY.unpack_from(self._index_map, INDEX_HEADER.size + height * INDEX_ENTRY.size)
+
+    # Segments ---------------------------------------------------------
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"blk{segment:05d}.dat")
+
+    def _recover_count(self):
+        """
+        Drop index entries whose bytes never reached their segment
+
+        A block's bytes are written before its index entry, so only a crash
+        between the two (or a lost segment tail) leaves entries past the end
+        of the data; those blocks are forgotten rather than read as zeros.
+        """
+        sizes = {}
+        count = self.count
+        while count:
+            segment, offset, length = self._entry(count - 1)
+            if segment not in sizes:
+                try:
+                    sizes[segment] = os.path.getsize(self._segment_path(segment))
+                except FileNotFoundError:
+                    sizes[segment] = 0
+            if offset + length <= sizes[segment]:
+                break
+            count -= 1
+        if count != self.count:
+            print(f"[BLOCKSTORE] {self.directory}: dropping {self.count - count} blocks missing from their segments")
+            self.count = count
+            INDEX_HEADER.pack_into(self._index_map, 0, INDEX_MAGIC, INDEX_VERSION, self.count)
+
+    def _open_active_segment(self):
+        self._recover_count()
+        if self.count:
+            self.segment, offset, length = self._entry(self.count - 1)
+            self.segment_offset = offset + length
+        else:
+            self.segment, self.segment_offset = 0, 0
+
+        self._open_segment()
+
+    def _open_segment(self):
+        self._segment_file = open(self._segment_path(self.segment), "a+b")
+        # Drop any bytes written after the last indexed block (torn append)
+        self._segment_file.truncate(self.segment_offset)
+
+    def _reader(self, segment):
+        """Read-only memory map of a sealed segment"""
+        view = self._readers.get(segment)
+        if view is None:
+            with open(self._segment_path(segment), "rb") as f:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._readers[segment] = view
+        return view
+
+    def _read(self, height):
+        """Record bytes of a block as a memoryview (no copy for sealed segments)"""
+        segment, offset, length = self._entry(height)
+        if segment == self.segment:
+            # The active segment is still growing; read it through its descriptor
+            self._segment_file.flush()
+            return memoryview(os.pread(self._segment_file.fileno(), length, offset))
+        return memoryview(self._reader(segment))[offset:offset + length]
+
+    # Public API -------------------------------------------------------
+
+    def append(self, block):
+        data = encode_block(block)
+        if self.segment_offset and self.segment_offset + len(data) > self.segment_size:
+            self._segment_file.close()
+            self.segment += 1
+            self.segment_offset = 0
+            self._open_segment()
+
+        # The bytes reach the file before the index counts them
+        self._segment_file.write(data)
+        self._segment_file.flush()
+        if self.count >= self._index_capacity():
+            self._grow_index()
+        INDEX_ENTRY.pack_into(
+            self._index_map,
+            INDEX_HEADER.size + self.count * INDEX_ENTRY.size,
+            self.segment, self.segment_offset, len(data)
+        )
+        self.segment_offset += len(data)
+        self.count += 1
+        INDEX_HEADER.pack_into(self._index_map, 0, INDEX_MAGIC, INDEX_VERSION, self.count)
+        self._remember(self.count - 1, block)
+
+    def get(self, height):
+        block = self.cache.get(height)
+        if block is not None:
+            self.cache.move_to_end(height)
+            return block
+        block = decode_block(self._read(height))
+        self._remember(height, block)
+        return block
+
+    def _remember(self, height, block):
+        self.cache[height] = block
+        self.cache.move_to_end(height)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def flush(self, fsync=False):
+        self._segment_file.flush()
+        self._index_map.flush()
+        if fsync:
+            os.fsync(self._segment_file.fileno())
+
+    def close(self):
+        self.flush()
+        self._segment_file.close()
+        self._index_map.close()
+        self._index_file.close()
+        for view in self._readers.values():
+            view.close()
+        self._readers.clear()
+        self.cache.clear()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, height):
+        if isinstance(height, slice):
+            return [self.get(h) for h in range(*height.indices(self.count))]
+        if height < 0:
+            height += self.count
+        if not 0 <= height < self.count:
+            raise IndexError("block height out of range")
+        return self.get(height)
+
+    def __iter__(self):
+        for height in range(self.count):
+            yield self.get(height)
+
+
+# Test function
+def test_block_store():
+    print("\nTesting BlockStore...")
+    import shutil
+    from core.chain import Blockchain
+    from core.transaction import Transaction
+
+    directory = "test_block_store"
+    shutil.rmtree(directory, ignore_errors=True)
+
+    store = BlockStore(directory, cache_size=8, segment_size=4096)
+    chain = Blockchain(store=store)
+    for i in range(200):
+        chain.add_block([Transaction(f"addr_{i}", f"addr_{i + 1}", i)])
+    tip = chain.chain[-1].hash
+    print(f"Blocks: {len(chain.chain)}, cached: {len(store.cache)}, segments: {store.segment + 1}")
+    assert len(store.cache) <= 8
+    store.close()
+
+    # Reopen: the chain and its index come back from disk
+    chain = Blockchain(store=BlockStore(directory, cache_size=8))
+    assert len(chain.chain) == 201
+    assert chain.chain[-1].hash == tip
+    assert chain.get_block_by_height(57).transactions[0].amount == 56
+    assert chain.get_block_by_hash(tip).index == 200
+    chain.chain.close()
+
+    # A segment that lost its tail: the index forgets the missing block
+    # instead of reading zeros
+    store = BlockStore(directory)
+    segment, offset, length = store._entry(store.count - 1)
+    store.close()
+    with open(store._segment_path(segment), "r+b") as f:
+        f.truncate(offset + length - 1)
+    chain = Blockchain(store=BlockStore(directory))
+    assert len(chain.chain) == 200
+    assert chain.chain[-1].index == 199
+    chain.add_block([Transaction("addr_x", "addr_y", 1)])
+    assert chain.chain[-1].index == 200
+    chain.chain.close()
+
+    # A process that dies without close() leaves every appended block readable
+    import subprocess
+    import sys
+    shutil.rmtree(directory, ignore_errors=True)
+    script = ("import os; from core.chain import Blockchain; from core.block_store import BlockStore; "
+              "from core.transaction import Transaction; chain = Blockchain(store=BlockStore(%r)); "
+              "[chain.add_block([Transaction('a', 'b', i)]) for i in range(50)]; os._exit(0)" % directory)
+    subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.DEVNULL)
+    chain = Blockchain(store=BlockStore(directory))
+    assert len(chain.chain) == 51
+    assert chain.chain[-1].transactions[0].amount == 49
+    chain.chain.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_block_store()
@@ -0,0 +1,182 @@
+# core/block_template.py
+
+from core.codec import encode_transaction
+from core.dynamic_block import DynamicBlockSize
+from core.minmax_heap import MinMaxHeap
+
+
+class _Candidate:
+    """A pending transaction ranked by fee per encoded byte"""
+    __slots__ = ('ptx', 'size', 'fee_rate', 'in_template', 'heap_index')
+
+    def __init__(self, ptx):
+        self.ptx = ptx
+        self.size = len(encode_transaction(ptx.tx))
+        self.fee_rate = ptx.fee / self.size
+        self.in_template = False
+        self.heap_index = None
+
+    @property
+    def key(self):
+        # Older first among equal fee rates
+        return (self.fee_rate, -self.ptx.seq)
+
+
+def _key(candidate):
+    return candidate.key
+
+
+class BlockTemplateBuilder:
+    """
+    Best fee-per-byte block contents, kept ready for the miner
+
+    The transactions of a PriorityMempool are split between `selected`
+    (the template, at most `limit` transactions) and `waiting`. Both are
+    min-max heaps, so an arrival or departure moves at most one transaction
+    across in O(log n), and the template never has to be rebuilt by sorting
+    the pool. The limit comes from DynamicBlockSize.calculate_block_size and
+    is refreshed whenever a template is requested.
+    """
+
+    def __init__(self, mempool, block_size=None, network_load=0.5):
+        self.mempool = mempool
+        self.block_size = block_size or DynamicBlockSize()
+        self.network_load = network_load
+        self.selected = MinMaxHeap(key=_key)
+        self.waiting = MinMaxHeap(key=_key)
+        self.candidates = {}  # tx_id -> _Candidate
+        self.limit = 0
+        self._template = []
+        self._dirty = False
+
+        self.set_limit(self.block_size.calculate_block_size(mempool, network_load))
+        for ptx in list(mempool.tx_map.values()):
+            self.tx_added(ptx)
+        mempool.watch(self)
+
+    # Mempool events ---------------------------------------------------
+
+    def tx_added(self, ptx):
+        candidate = _Candidate(ptx)
+        self.candidates[_tx_id(ptx)] = candidate
+
+        lowest = self.selected.peek_min()
+        if len(self.selected) < self.limit:
+            self._select(candidate)
+        elif lowest is not None and candidate.key > lowest.key:
+            self._unselect(self.selected.pop_min())
+            self._select(candidate)
+        else:
+            self.waiting.push(candidate)
+
+    def tx_removed(self, ptx):
+        tx_id = _tx_id(ptx)
+        candidate = self.candidates.get(tx_id)
+        if candidate is None or candidate.ptx is not ptx:
+            return
+        del self.candidates[tx_id]
+
+        if candidate.in_template:
+            self.selected.remove(candidate)
+            self._dirty = True
+            best = self.waiting.pop_max()
+            if best is not None:
+                self._select(best)
+        else:
+            self.waiting.remove(candidate)
+
+    # Limit ------------------------------------------------------------
+
+    def set_limit(self, limit):
+        """Resize the template to `limit` transactions"""
+        self.limit = limit
+        while len(self.selected) > limit:
+            self._unselect(self.selected.pop_min())
+        while len(self.selected) < limit and len(self.waiting):
+            self._select(self.waiting.pop_max())
+
+    def refresh(self, network_load=None):
+        """Recompute the limit from the current mempool size and network load"""
+        if network_load is not None:
+            self.network_load = network_load
+        self.set_limit(self.block_size.calculate_block_size(self.mempool, self.network_load))
+        return self.limit
+
+    # Template ---------------------------------------------------------
+
+    def get_template(self, network_load=None):
+        """Transactions for the next block, best fee rate first"""
+        self.refresh(network_load)
+        if self._dirty:
+            ranked = sorted(self.selected, key=_key, reverse=True)
+            self._template = [candidate.ptx.tx for candidate in ranked]
+            self._dirty = False
+        return list(self._template)
+
+    @property
+    def template_bytes(self):
+        return sum(candidate.size for candidate in self.selected)
+
+    @property
+    def template_fees(self):
+        return sum(candidate.ptx.fee for candidate in self.selected)
+
+    def _select(self, candidate):
+        candidate.in_template = True
+        self.selected.push(candidate)
+        self._dirty = True
+
+    def _unselect(self, candidate):
+        candidate.in_template = False
+        self.waiting.push(candidate)
+        self._dirty = True
+        return candidate
+
+
+def _tx_id(ptx):
+    return getattr(ptx.tx, 'tx_id', str(id(ptx.tx)))
+
+
+# Test function
+def test_block_template():
+    print("\nTesting BlockTemplateBuilder...")
+    import random
+    from core.priority_mempool import PriorityMempool
+    from core.transaction import Transaction
+
+    rng = random.Random(3)
+    mempool = PriorityMempool(max_size=200, verbose=False)
+    builder = BlockTemplateBuilder(mempool, DynamicBlockSize(min_size=1, max_size=10, base_size=6))
+
+    def expected():
+        ranked = sorted(
+            mempool.tx_map.values(),
+            key=lambda ptx: (ptx.fee / len(encode_transaction(ptx.tx)), -ptx.seq),
+            reverse=True
+        )
+        return [ptx.tx.tx_id for ptx in ranked[:builder.limit]]
+
+    for i in range(2000):
+        op = rng.random()
+        if op < 0.6 or not len(mempool):
+            tx = Transaction(f"addr_{rng.randint(0, 99)}", f"addr_{rng.randint(0, 99)}", rng.randint(1, 10**6))
+            mempool.add_tx(tx, rng.random(), rng.random() * 5)
+        elif op < 0.75:
+            ptx = rng.choice(list(mempool.tx_map.values()))
+            mempool.add_tx(ptx.tx, ptx.ai_score, ptx.fee * 2 + 0.1)
+        elif op < 0.9:
+            mempool.remove_tx(rng.choice(list(mempool.tx_map)))
+        else:
+            template = builder.get_template(network_load=rng.random())
+            assert [tx.tx_id for tx in template] == expected()
+            mempool.remove_confirmed(template)
+
+    template = builder.get_template()
+    print(f"Template: {len(template)} txs, {builder.template_bytes} bytes, fees {builder.template_fees:.2f}")
+    assert [tx.tx_id for tx in template] == expected()
+    assert len(builder.candidates) == len(mempool)
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_block_template()
@@ -1,37 +1,111 @@
+import threading
 import time
-import hashlib
+from core.chain_index import ChainIndex, tx_key
+from core.header import BlockHeader
+from core.merkle import merkle_root
+from core.mining import ParallelMiner, difficulty_target, search_nonces
 
 class Block:
-    def __init__(self, index, previous_hash, transactions, nonce=0, hash=""):
+    def __init__(self, index, previous_hash, transactions, nonce=0, hash="", header=None):
         self.index = index
-        self.timestamp = time.time()
+        self.timestamp = header.timestamp if header else time.time()
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.nonce = nonce
         self.hash = hash
+        self.header = header
 
 class Blockchain:
-    def __init__(self):
+    def __init__(self, workers=1):
         self.chain = [self.create_genesis_block()]
+        self.index = ChainIndex(self.chain)
+        self.index.add_block(self.chain[0], 0)
         self.difficulty = 4
+        self.workers = workers
+        self.miner = None
+        # Guards tip check + append: MiningJob mines on its own thread
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
 
     def create_genesis_block(self):
         return Block(0, "0", [], 0, "0")
 
-    def mine_block(self, transactions):
+    def mine_block(self, transactions, workers=None, stop_event=None):
+        """
+        Mine a block; workers > 1 searches the nonce space in parallel
+
+        Returns None if stop_event was set or the tip changed while mining.
+        """
         last_block = self.chain[-1]
-        nonce = 0
-        while True:
-            content = f"{last_block.hash}{transactions}{nonce}"
-            hash_try = hashlib.sha256(content.encode()).hexdigest()
-            if hash_try.startswith("0" * self.difficulty):
-                new_block = Block(
-                    index=last_block.index + 1,
-                    previous_hash=last_block.hash,
-                    transactions=transactions,
-                    nonce=nonce,
-                    hash=hash_try
-                )
-                self.chain.append(new_block)
-                return new_block
-            nonce += 1
+        header = BlockHeader(last_block.hash, merkle_root(transactions), difficulty=self.difficulty)
+        prefix = header.prefix()
+        workers = workers or self.workers
+        if workers > 1:
+            if self.miner is None or self.miner.workers != workers:
+                self.close()
+                self.miner = ParallelMiner(workers)
+            result = self.miner.search(prefix, self.difficulty, stop_event)
+        else:
+            result = search_nonces(prefix, self.difficulty, stop_event=stop_event)
+        if result is None:
+            return None
+        nonce, hash_try = result
+        header.nonce = nonce
+
+        new_block = Block(
+            index=last_block.index + 1,
+            previous_hash=last_block.hash,
+            transactions=transactions,
+            nonce=nonce,
+            hash=hash_try,
+            header=header
+        )
+        with self.lock:
+            if self.chain[-1] is not last_block:
+                return None  # Another block landed while mining
+            self.chain.append(new_block)
+            self.index.add_block(new_block, new_block.index)
+        return new_block
+
+    def add_block(self, block):
+        """Append a block mined elsewhere if it extends the tip with valid PoW"""
+        header = block.header
+        if header is None:
+            return False
+        if header.difficulty < self.difficulty or header.hash() != block.hash:
+            return False
+        if bytes.fromhex(block.hash) >= difficulty_target(header.difficulty):
+            return False
+        if header.merkle_root != merkle_root(block.transactions):
+            return False
+        with self.lock:
+            if block.previous_hash != self.chain[-1].hash:
+                return False
+            if any(self.index.contains_tx(tx_key(tx)) for tx in block.transactions):
+                return False  # Already included in an earlier block
+            self.chain.append(block)
+            self.index.add_block(block, len(self.chain) - 1)
+        return True
+
+    def get_block_by_hash(self, block_hash):
+        return self.index.get_block(block_hash)
+
+    def get_block_by_height(self, height):
+        return self.index.get_block_at(height)
+
+    def find_transaction(self, tx_id):
+        return self.index.get_transaction(tx_id)
+
+    def close(self):
+        """Shut down the mining process pool, if any"""
+        if self.miner is not None:
+            self.miner.close()
+            self.miner = None
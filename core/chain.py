@@ -1,15 +1,37 @@
+import os
+
 from core.block import Block
+from core.chain_index import ChainIndex, PersistentChainIndex
 
 class Blockchain:
-    def __init__(self):
-        self.chain = []
-        self.create_genesis()
+    def __init__(self, store=None):
+        # A BlockStore keeps the chain on disk with only recent blocks in memory;
+        # its index is kept on disk next to it and only catches up on open
+        self.chain = store if store is not None else []
+        if store is not None:
+            self.index = PersistentChainIndex(self.chain, os.path.join(store.directory, "chain_index.db"))
+            self.index.catch_up()
+        else:
+            self.index = ChainIndex(self.chain)
+        if not len(self.chain):
+            self.create_genesis()
     
     def create_genesis(self):
         genesis = Block(0, [], "0")
         self.chain.append(genesis)
+        self.index.add_block(genesis, 0)
     
     def add_block(self, transactions):
         prev = self.chain[-1]
         block = Block(len(self.chain), transactions, prev.hash)
         self.chain.append(block)
+        self.index.add_block(block, block.index)
+    
+    def get_block_by_hash(self, block_hash):
+        return self.index.get_block(block_hash)
+    
+    def get_block_by_height(self, height):
+        return self.index.get_block_at(height)
+    
+    def find_transaction(self, tx_id):
+        return self.index.get_transaction(tx_id)
@@ -0,0 +1,225 @@
+# core/chain_index.py
+
+import sqlite3
+
+def tx_key(tx):
+    """Identifier a transaction is indexed under (None if it has none)"""
+    tx_id = getattr(tx, 'tx_id', None)
+    if tx_id is None and isinstance(tx, dict):
+        tx_id = tx.get('tx_id', tx.get('id'))
+    return tx_id
+
+
+class ChainIndex:
+    """
+    O(1) block and transaction lookups for a chain
+
+    `blocks` is the chain's own height-ordered sequence, which already acts
+    as the height -> block map; the index adds hash -> height and
+    tx_id -> (height, position) and is updated one block at a time.
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.heights = {}
+        self.tx_locations = {}
+
+    def add_block(self, block, height):
+        self.heights[block.hash] = height
+        for position, tx in enumerate(block.transactions):
+            key = tx_key(tx)
+            if key is not None:
+                self.tx_locations[key] = (height, position)
+
+    def remove_block(self, block):
+        """Forget a block that is being disconnected from the tip"""
+        height = self.heights.pop(block.hash, None)
+        for tx in block.transactions:
+            key = tx_key(tx)
+            if key is not None and self.tx_locations.get(key, (None,))[0] == height:
+                del self.tx_locations[key]
+
+    def get_block(self, block_hash):
+        height = self.heights.get(block_hash)
+        return None if height is None else self.blocks[height]
+
+    def get_block_at(self, height):
+        if 0 <= height < len(self.blocks):
+            return self.blocks[height]
+        return None
+
+    def get_height(self, block_hash):
+        return self.heights.get(block_hash)
+
+    def find_tx(self, tx_id):
+        """(height, position) of the block that contains tx_id, or None"""
+        return self.tx_locations.get(tx_id)
+
+    def get_transaction(self, tx_id):
+        location = self.tx_locations.get(tx_id)
+        if location is None:
+            return None
+        height, position = location
+        return self.blocks[height].transactions[position]
+
+    def contains_tx(self, tx_id):
+        return tx_id in self.tx_locations
+
+    def rebuild(self):
+        """Re-index every block (e.g. after loading a chain from a snapshot)"""
+        self.heights.clear()
+        self.tx_locations.clear()
+        for height, block in enumerate(self.blocks):
+            self.add_block(block, height)
+
+
+class PersistentChainIndex(ChainIndex):
+    """
+    ChainIndex kept on disk (SQLite, WAL mode) next to a BlockStore
+
+    The hash and tx maps live in the database, so resident memory does not
+    grow with the chain, and `indexed` records how many blocks are covered.
+    Opening the index only indexes the blocks appended since it was last
+    written (catch_up), instead of decoding the whole store.
+    """
+
+    def __init__(self, blocks, db_file):
+        self.blocks = blocks
+        self.db_file = db_file
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS blocks (hash TEXT PRIMARY KEY, height INTEGER);
+            CREATE TABLE IF NOT EXISTS txs (tx_id PRIMARY KEY, height INTEGER, position INTEGER);
+            CREATE INDEX IF NOT EXISTS blocks_height ON blocks (height);
+            CREATE INDEX IF NOT EXISTS txs_height ON txs (height);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+        """)
+
+    @property
+    def indexed(self):
+        """Number of blocks (heights 0..indexed-1) already in the index"""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'indexed'").fetchone()
+        return row[0] if row else 0
+
+    def _write_block(self, block, height):
+        self.db.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?)", (block.hash, height))
+        self.db.executemany(
+            "INSERT OR REPLACE INTO txs VALUES (?, ?, ?)",
+            [(key, height, position) for position, key in enumerate(map(tx_key, block.transactions))
+             if key is not None])
+
+    def _truncate(self, height):
+        """Forget every block at or above height"""
+        self.db.execute("DELETE FROM blocks WHERE height >= ?", (height,))
+        self.db.execute("DELETE FROM txs WHERE height >= ?", (height,))
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('indexed', ?)", (height,))
+
+    def add_block(self, block, height):
+        with self.db:
+            self._write_block(block, height)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('indexed', ?)", (max(self.indexed, height + 1),))
+
+    def remove_block(self, block):
+        row = self.db.execute("SELECT height FROM blocks WHERE hash = ?", (block.hash,)).fetchone()
+        if row is not None:
+            with self.db:
+                self._truncate(row[0])
+
+    def catch_up(self, batch=1000):
+        """Index the blocks the store gained since the index was written"""
+        count = len(self.blocks)
+        indexed = self.indexed
+        if indexed > count:
+            with self.db:
+                self._truncate(count)  # the store lost a torn tail
+            return 0
+        for start in range(indexed, count, batch):
+            end = min(start + batch, count)
+            with self.db:
+                for height in range(start, end):
+                    self._write_block(self.blocks[height], height)
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('indexed', ?)", (end,))
+        return count - indexed
+
+    def get_height(self, block_hash):
+        row = self.db.execute("SELECT height FROM blocks WHERE hash = ?", (block_hash,)).fetchone()
+        return row[0] if row else None
+
+    def get_block(self, block_hash):
+        height = self.get_height(block_hash)
+        return None if height is None else self.blocks[height]
+
+    def find_tx(self, tx_id):
+        row = self.db.execute("SELECT height, position FROM txs WHERE tx_id = ?", (tx_id,)).fetchone()
+        return tuple(row) if row else None
+
+    def get_transaction(self, tx_id):
+        location = self.find_tx(tx_id)
+        if location is None:
+            return None
+        height, position = location
+        return self.blocks[height].transactions[position]
+
+    def contains_tx(self, tx_id):
+        return self.find_tx(tx_id) is not None
+
+    def rebuild(self):
+        with self.db:
+            self._truncate(0)
+        self.catch_up()
+
+    def close(self):
+        self.db.close()
+
+
+# Test function
+def test_chain_index():
+    print("\nTesting ChainIndex...")
+    from core.block import Block
+    from core.chain import Blockchain
+    from core.transaction import Transaction
+
+    chain = Blockchain()
+    sent = []
+    for i in range(5):
+        txs = [Transaction(f"addr_{i}", f"addr_{i + 1}", 10 * j) for j in range(3)]
+        sent.extend(txs)
+        chain.add_block(txs)
+
+    target = chain.chain[3]
+    assert chain.get_block_by_hash(target.hash) is target
+    assert chain.get_block_by_height(3) is target
+    assert chain.index.find_tx(sent[7].tx_id) == (3, 1)
+    assert chain.find_transaction(sent[7].tx_id) is sent[7]
+    assert not chain.index.contains_tx("missing")
+    print(f"Indexed {len(chain.chain)} blocks and {len(chain.index.tx_locations)} transactions")
+
+    # A store-backed chain keeps its index on disk and only indexes new blocks on open
+    import shutil
+    from core.block_store import BlockStore
+    directory = "test_chain_index_store"
+    shutil.rmtree(directory, ignore_errors=True)
+    chain = Blockchain(store=BlockStore(directory))
+    for i in range(5):
+        chain.add_block([Transaction(f"addr_{i}", f"addr_{i + 1}", i)])
+    tx = chain.chain[4].transactions[0]
+    chain.chain.close()
+    chain.index.close()
+
+    store = BlockStore(directory)
+    store.append(Block(len(store), [Transaction("late", "block", 1)], store[-1].hash))
+    chain = Blockchain(store=store)
+    assert chain.index.indexed == len(chain.chain) == 7
+    assert chain.find_transaction(tx.tx_id).amount == tx.amount
+    assert chain.index.find_tx(chain.chain[6].transactions[0].tx_id) == (6, 0)
+    assert chain.get_block_by_hash(chain.chain[3].hash).index == 3
+    chain.chain.close()
+    chain.index.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_chain_index()
@@ -0,0 +1,456 @@
+# core/codec.py
+
+import json
+import struct
+import uuid
+
+from core.header import BlockHeader, HEADER_SIZE
+
+CODEC_VERSION = 2
+# 1: every tx id stored; 2: content-addressed tx ids are derived, not stored
+SUPPORTED_VERSIONS = (1, 2)
+
+# Record kinds
+TX_TRANSFER = 0   # core.transaction.Transaction (or anything with sender/receiver/amount)
+TX_RAW = 1        # any other JSON-serializable payload (dict, str, ...)
+BLOCK_SIMPLE = 0  # core.block.Block
+BLOCK_POW = 1     # core.blockchain.Block
+
+# Value tags
+VAL_NONE = 0
+VAL_INT = 1
+VAL_FLOAT = 2
+VAL_STR = 3
+
+# Id / hash tags
+ID_STR = 0
+ID_DIGEST = 1  # 64 hex chars stored as 32 bytes
+ID_UUID = 2    # canonical uuid string stored as 16 bytes
+ID_DERIVED = 3  # content-addressed tx id, recomputed from the payload when needed
+
+# Block transaction sections
+TXS_RECORDS = 0      # one variable-length record per transaction
+TXS_TABLE_UUID = 1   # fixed-width rows, uuid tx ids (kept as text: cheapest to decode)
+TXS_TABLE_DIGEST = 2  # fixed-width rows, sha256 tx ids
+TXS_TABLE_COMPACT = 3  # fixed-width rows, derived tx ids, < 65536 addresses
+TXS_TABLE_WIDE = 4     # fixed-width rows, derived tx ids
+
+# sender slot, receiver slot, amount is int, amount, timestamp[, tx id]
+TX_ROWS = {
+    TXS_TABLE_UUID: struct.Struct(">II?dd36s"),
+    TXS_TABLE_DIGEST: struct.Struct(">II?dd32s"),
+    TXS_TABLE_COMPACT: struct.Struct(">HH?dd"),
+    TXS_TABLE_WIDE: struct.Struct(">II?dd"),
+}
+
+F64 = struct.Struct(">d")
+MAX_EXACT_INT = 1 << 53
+
+
+# Writing ----------------------------------------------------------------
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_str(out, value):
+    data = value.encode("utf-8")
+    write_varint(out, len(data))
+    out += data
+
+
+def write_value(out, value):
+    if value is None:
+        out.append(VAL_NONE)
+    elif isinstance(value, int) and not isinstance(value, bool):
+        out.append(VAL_INT)
+        write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif isinstance(value, float):
+        out.append(VAL_FLOAT)
+        out += F64.pack(value)
+    else:
+        out.append(VAL_STR)
+        write_str(out, str(value))
+
+
+def write_id(out, value):
+    value = str(value)
+    # Only lowercase hex round-trips through bytes.hex()
+    if len(value) == 64 and value == value.lower():
+        try:
+            digest = bytes.fromhex(value)
+            out.append(ID_DIGEST)
+            out += digest
+            return
+        except ValueError:
+            pass
+    elif len(value) == 36:
+        try:
+            parsed = uuid.UUID(value)
+            if str(parsed) == value:
+                out.append(ID_UUID)
+                out += parsed.bytes
+                return
+        except ValueError:
+            pass
+    out.append(ID_STR)
+    write_str(out, value)
+
+
+# Reading (zero-copy over a memoryview) ----------------------------------
+
+class Reader:
+    """Cursor over a memoryview; nothing is copied except decoded strings"""
+
+    def __init__(self, data, pos=0):
+        self.view = data if isinstance(data, memoryview) else memoryview(data)
+        self.pos = pos
+
+    def byte(self):
+        value = self.view[self.pos]
+        self.pos += 1
+        return value
+
+    def varint(self):
+        view = self.view
+        pos = self.pos
+        result = shift = 0
+        while True:
+            b = view[pos]
+            pos += 1
+            result |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        self.pos = pos
+        return result
+
+    def raw(self, size):
+        start = self.pos
+        self.pos += size
+        return self.view[start:self.pos]
+
+    def str(self):
+        return str(self.raw(self.varint()), "utf-8")
+
+    def f64(self):
+        (value,) = F64.unpack_from(self.view, self.pos)
+        self.pos += 8
+        return value
+
+    def value(self):
+        tag = self.byte()
+        if tag == VAL_NONE:
+            return None
+        if tag == VAL_INT:
+            n = self.varint()
+            return (n >> 1) ^ -(n & 1)
+        if tag == VAL_FLOAT:
+            return self.f64()
+        return self.str()
+
+    def id(self):
+        tag = self.byte()
+        if tag == ID_DIGEST:
+            return self.raw(32).hex()
+        if tag == ID_UUID:
+            return str(uuid.UUID(bytes=bytes(self.raw(16))))
+        if tag == ID_DERIVED:
+            return None
+        return self.str()
+
+    def version(self):
+        version = self.byte()
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported codec version {version}")
+        return version
+
+
+# Transactions -----------------------------------------------------------
+
+def _is_transfer(tx):
+    return all(hasattr(tx, name) for name in ("sender", "receiver", "amount"))
+
+
+def _derived_id(tx):
+    from core.transaction import Transaction
+
+    return isinstance(tx, Transaction) and tx.content_addressed
+
+
+def _write_tx(out, tx, addresses):
+    """Write one transaction; addresses maps address -> table slot (None = inline)"""
+    if not _is_transfer(tx):
+        out.append(TX_RAW)
+        write_str(out, json.dumps(tx, sort_keys=True, default=str))
+        return
+
+    out.append(TX_TRANSFER)
+    for address in (tx.sender, tx.receiver):
+        if addresses is None:
+            write_str(out, str(address))
+        else:
+            write_varint(out, addresses[address])
+    write_value(out, tx.amount)
+    write_value(out, getattr(tx, "timestamp", None))
+    if _derived_id(tx):
+        out.append(ID_DERIVED)
+    else:
+        write_id(out, getattr(tx, "tx_id", ""))
+
+
+def _plain_amount(amount):
+    """Amounts a float64 column stores exactly"""
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return False
+    return not isinstance(amount, int) or abs(amount) < MAX_EXACT_INT
+
+
+def _id_kind(tx_id):
+    buf = bytearray()
+    write_id(buf, tx_id)
+    return buf[0]
+
+
+def _table_layout(transactions, address_count):
+    """Fixed-width row layout for the block's transactions, or None"""
+    if address_count and all(_derived_id(tx) for tx in transactions):
+        for tx in transactions:
+            if not isinstance(tx.timestamp, float) or not _plain_amount(tx.amount):
+                return None
+        return TXS_TABLE_COMPACT if address_count < 65536 else TXS_TABLE_WIDE
+
+    layout = None
+    for tx in transactions:
+        if not _is_transfer(tx) or not isinstance(getattr(tx, "timestamp", None), float):
+            return None
+        if not _plain_amount(tx.amount):
+            return None
+        kind = _id_kind(getattr(tx, "tx_id", ""))
+        if kind == ID_STR or (layout is not None and kind != layout):
+            return None
+        layout = kind
+    return {ID_UUID: TXS_TABLE_UUID, ID_DIGEST: TXS_TABLE_DIGEST}.get(layout)
+
+
+def _read_tx(reader, addresses):
+    from core.transaction import Transaction
+
+    kind = reader.byte()
+    if kind == TX_RAW:
+        return json.loads(reader.str())
+
+    if addresses is None:
+        sender, receiver = reader.str(), reader.str()
+    else:
+        sender, receiver = addresses[reader.varint()], addresses[reader.varint()]
+    amount = reader.value()
+    timestamp = reader.value()
+    return Transaction.restore(sender, receiver, amount, timestamp, reader.id())
+
+
+def encode_transaction(tx):
+    out = bytearray([CODEC_VERSION])
+    _write_tx(out, tx, None)
+    return bytes(out)
+
+
+def decode_transaction(data):
+    reader = Reader(data)
+    reader.version()
+    return _read_tx(reader, None)
+
+
+# Blocks -----------------------------------------------------------------
+
+def encode_block(block):
+    """Binary form of a core.block.Block or core.blockchain.Block"""
+    out = bytearray([CODEC_VERSION])
+    pow_block = hasattr(block, "previous_hash")
+    out.append(BLOCK_POW if pow_block else BLOCK_SIMPLE)
+    write_varint(out, block.index)
+    out += F64.pack(block.timestamp)
+    write_id(out, block.previous_hash if pow_block else block.prev_hash)
+    write_id(out, block.hash)
+
+    if pow_block:
+        write_varint(out, block.nonce)
+        if block.header is None:
+            out.append(0)
+        else:
+            out.append(1)
+            out += block.header.serialize()
+    else:
+        out += block.merkle_root
+
+    # Address table: every address is written once per block
+    addresses = {}
+    for tx in block.transactions:
+        if _is_transfer(tx):
+            addresses.setdefault(tx.sender, len(addresses))
+            addresses.setdefault(tx.receiver, len(addresses))
+    write_varint(out, len(addresses))
+    for address in addresses:
+        write_str(out, str(address))
+
+    write_varint(out, len(block.transactions))
+    layout = _table_layout(block.transactions, len(addresses))
+    if layout is None:
+        out.append(TXS_RECORDS)
+        for tx in block.transactions:
+            _write_tx(out, tx, addresses)
+    else:
+        # Plain transfers become fixed-width rows decoded with one iter_unpack
+        out.append(layout)
+        row = TX_ROWS[layout]
+        for tx in block.transactions:
+            fields = [addresses[tx.sender], addresses[tx.receiver], isinstance(tx.amount, int),
+                      float(tx.amount), tx.timestamp]
+            if layout == TXS_TABLE_UUID:
+                fields.append(str(tx.tx_id).encode("ascii"))
+            elif layout == TXS_TABLE_DIGEST:
+                fields.append(bytes.fromhex(str(tx.tx_id)))
+            out += row.pack(*fields)
+    return bytes(out)
+
+
+def _read_tx_table(reader, addresses, count, layout):
+    from core.transaction import Transaction
+
+    row = TX_ROWS[layout]
+    rows = reader.raw(count * row.size)
+    restore = Transaction.restore
+    if layout in (TXS_TABLE_COMPACT, TXS_TABLE_WIDE):
+        return [
+            restore(addresses[s], addresses[r], int(amount) if is_int else amount, timestamp)
+            for s, r, is_int, amount, timestamp in row.iter_unpack(rows)
+        ]
+    as_text = layout == TXS_TABLE_UUID
+    return [
+        restore(addresses[s], addresses[r], int(amount) if is_int else amount, timestamp,
+                str(raw_id, "ascii") if as_text else raw_id.hex())
+        for s, r, is_int, amount, timestamp, raw_id in row.iter_unpack(rows)
+    ]
+
+
+def decode_block(data):
+    from core import block as simple
+    from core import blockchain as pow_chain
+
+    reader = Reader(data)
+    reader.version()
+    kind = reader.byte()
+    index = reader.varint()
+    timestamp = reader.f64()
+    prev_hash = reader.id()
+    block_hash = reader.id()
+
+    if kind == BLOCK_POW:
+        block = pow_chain.Block.__new__(pow_chain.Block)
+        block.previous_hash = prev_hash
+        block.nonce = reader.varint()
+        block.header = BlockHeader.deserialize(reader.raw(HEADER_SIZE)) if reader.byte() else None
+        if block.header is not None:
+            block.header.prev_hash = prev_hash
+    else:
+        block = simple.Block.__new__(simple.Block)
+        block.prev_hash = prev_hash
+        block.merkle_root = bytes(reader.raw(32))
+    block.index = index
+    block.timestamp = timestamp
+    block.hash = block_hash
+
+    addresses = [reader.str() for _ in range(reader.varint())]
+    count = reader.varint()
+    layout = reader.byte()
+    if layout == TXS_RECORDS:
+        block.transactions = [_read_tx(reader, addresses) for _ in range(count)]
+    else:
+        block.transactions = _read_tx_table(reader, addresses, count, layout)
+    return block
+
+
+# Chains -----------------------------------------------------------------
+
+CHAIN_MAGIC = b"ASTC"
+
+
+def write_chain(f, blocks):
+    """Stream blocks to a file as length-prefixed codec records"""
+    f.write(CHAIN_MAGIC)
+    for block in blocks:
+        record = encode_block(block)
+        prefix = bytearray()
+        write_varint(prefix, len(record))
+        f.write(prefix)
+        f.write(record)
+
+
+def is_chain(data):
+    return bytes(data[:4]) == CHAIN_MAGIC
+
+
+def read_chain(data):
+    """Decode a write_chain() buffer (bytes, mmap or memoryview)"""
+    reader = Reader(data, len(CHAIN_MAGIC))
+    blocks = []
+    while reader.pos < len(reader.view):
+        length = reader.varint()
+        blocks.append(decode_block(reader.raw(length)))
+    return blocks
+
+
+# Test function
+def test_codec():
+    print("\nTesting binary codec...")
+    import pickle
+    import time
+    from core.blockchain import Blockchain
+    from core.chain import Blockchain as SimpleChain
+    from core.transaction import Transaction
+
+    names = [f"address_{i:04d}" for i in range(50)]
+    txs = [Transaction(names[i % 50], names[(i * 7) % 50], i * 1.5) for i in range(5000)]
+
+    chain = SimpleChain()
+    chain.add_block(txs)
+    block = chain.chain[-1]
+
+    data = encode_block(block)
+    pickled = pickle.dumps(block, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"Block with {len(txs)} txs: codec {len(data):,} bytes, pickle {len(pickled):,} bytes")
+
+    start = time.time()
+    decoded = decode_block(memoryview(data))
+    codec_time = time.time() - start
+    start = time.time()
+    pickle.loads(pickled)
+    pickle_time = time.time() - start
+    print(f"Decode: codec {codec_time * 1000:.1f} ms, unpickle {pickle_time * 1000:.1f} ms")
+
+    assert decoded.hash == block.hash and decoded.calculate_hash() == block.hash
+    assert [t.tx_id for t in decoded.transactions] == [t.tx_id for t in txs]
+    assert decoded.transactions == txs
+    assert decoded.transactions[3].amount == txs[3].amount
+
+    for tx_id in ("AB" * 32, "ab" * 32):
+        buf = bytearray()
+        write_id(buf, tx_id)
+        assert Reader(buf).id() == tx_id
+
+    tx = decode_transaction(encode_transaction(txs[0]))
+    assert (tx.sender, tx.receiver, tx.amount, tx.tx_id) == (txs[0].sender, txs[0].receiver, txs[0].amount, txs[0].tx_id)
+
+    pow_chain = Blockchain()
+    pow_block = pow_chain.mine_block([{"from": "alice", "to": "bob", "amount": 5}])
+    decoded = decode_block(encode_block(pow_block))
+    assert decoded.header.hash() == pow_block.hash
+    assert decoded.transactions == pow_block.transactions
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_codec()
@@ -0,0 +1,286 @@
+# core/concurrent_mempool.py
+
+import heapq
+import threading
+from operator import itemgetter
+
+from core.priority_mempool import PriorityMempool, AI_WEIGHT, FEE_WEIGHT
+
+
+def _sender(tx):
+    if isinstance(tx, dict):
+        return tx.get('sender', tx.get('from'))
+    return getattr(tx, 'sender', None)
+
+
+class _Shard:
+    """One PriorityMempool, its lock and its last published top entries"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.lock = threading.Lock()
+        self.version = 0           # bumped by every write, under the lock
+        self.contended = 0         # acquisitions that had to wait
+        # Immutable (version, depth, ((sort_key, tx), ...)) swapped in as one reference
+        self.published = (-1, 0, ())
+
+    def acquire(self):
+        if not self.lock.acquire(blocking=False):
+            self.contended += 1
+            self.lock.acquire()
+
+    def publish(self, depth):
+        entries = tuple((ptx.sort_key, ptx.tx) for ptx in self.pool.heap.largest(depth, accept=_is_live))
+        self.published = (self.version, depth, entries)
+
+
+def _is_live(ptx):
+    return not ptx.removed
+
+
+class ConcurrentPriorityMempool:
+    """
+    PriorityMempool split into shards by sender hash, one lock per shard
+
+    Writers only lock the shard of the sender involved, so submitters of
+    different senders do not serialize, while one sender's transactions
+    stay in one shard (and in order). Capacity and eviction are per shard:
+    each holds max_size / shards transactions and evicts its own lowest.
+
+    snapshot(n) never blocks: each shard publishes an immutable tuple of
+    its top entries, and a reader only refreshes a stale one if it can take
+    that shard's lock without waiting; otherwise it merges the previous
+    publication, which lags by at most the writes in flight.
+    """
+
+    def __init__(self, max_size=1000, shards=16, snapshot_depth=20, min_fee_bump=0.1,
+                 compact_ratio=0.5, ai_weight=AI_WEIGHT, fee_weight=FEE_WEIGHT):
+        self.max_size = max_size
+        self.snapshot_depth = snapshot_depth
+        shard_size = -(-max_size // shards)
+        self.shards = [
+            _Shard(PriorityMempool(shard_size, verbose=False, min_fee_bump=min_fee_bump,
+                                   compact_ratio=compact_ratio, ai_weight=ai_weight,
+                                   fee_weight=fee_weight))
+            for _ in range(shards)
+        ]
+        print(f"[PRIORITY] Concurrent mempool created (max: {max_size}, shards: {shards})")
+
+    def _shard(self, tx):
+        return self.shards[hash(_sender(tx)) % len(self.shards)]
+
+    def _acquire_holding(self, tx_id):
+        """
+        Lock and return the shard holding tx_id, or None
+
+        The shard is found with an unlocked dict probe, then locked and
+        checked again, so the caller acts on what it checked under the
+        lock. A transaction never changes shard (the shard follows its
+        sender), so if it is gone by then it has been removed.
+        """
+        for shard in self.shards:
+            if tx_id in shard.pool.tx_map:
+                shard.acquire()
+                if tx_id in shard.pool.tx_map:
+                    return shard
+                shard.lock.release()
+                return None
+        return None
+
+    # Writes -------------------------------------------------------------
+
+    def add_tx(self, tx, ai_score=0.5, fee=0):
+        shard = self._shard(tx)
+        shard.acquire()
+        try:
+            added = shard.pool.add_tx(tx, ai_score, fee)
+            if added:
+                shard.version += 1
+            return added
+        finally:
+            shard.lock.release()
+
+    def remove_tx(self, tx_id):
+        """Remove a transaction by id; returns it, or None if it is not pending"""
+        shard = self._acquire_holding(tx_id)
+        if shard is None:
+            return None
+        try:
+            tx = shard.pool.remove_tx(tx_id)
+            if tx is not None:
+                shard.version += 1
+            return tx
+        finally:
+            shard.lock.release()
+
+    def remove_confirmed(self, transactions):
+        """Drop the transactions of a confirmed block, locking each shard once"""
+        by_shard = {}
+        removed = 0
+        for tx in transactions:
+            if isinstance(tx, str):
+                removed += self.remove_tx(tx) is not None
+            else:
+                shard = self._shard(tx)
+                by_shard.setdefault(id(shard), (shard, []))[1].append(tx)
+
+        for shard, txs in by_shard.values():
+            shard.acquire()
+            try:
+                count = shard.pool.remove_confirmed(txs)
+                if count:
+                    shard.version += 1
+                removed += count
+            finally:
+                shard.lock.release()
+        return removed
+
+    def rescore(self, scores=None, ai_weight=None, fee_weight=None):
+        """PriorityMempool.rescore on every shard, one shard locked at a time"""
+        updated = 0
+        for shard in self.shards:
+            shard.acquire()
+            try:
+                updated += shard.pool.rescore(scores, ai_weight, fee_weight)
+                shard.version += 1
+            finally:
+                shard.lock.release()
+        return updated
+
+    # Lock-free reads ----------------------------------------------------
+
+    def snapshot(self, count=10):
+        """Top `count` (sort_key, tx) pairs across all shards, best first"""
+        depth = max(count, self.snapshot_depth)
+        entries = []
+        for shard in self.shards:
+            version, published_depth, published = shard.published
+            stale = version != shard.version or published_depth < count
+            if stale and shard.lock.acquire(blocking=False):
+                try:
+                    shard.publish(depth)
+                finally:
+                    shard.lock.release()
+                published = shard.published[2]
+            entries.append(published)
+        return heapq.nlargest(count, (entry for shard_entries in entries for entry in shard_entries),
+                              key=itemgetter(0))
+
+    def get_next_transactions(self, count=10):
+        """Get next N highest priority transactions"""
+        return [tx for _, tx in self.snapshot(count)]
+
+    def __len__(self):
+        return sum(len(shard.pool) for shard in self.shards)
+
+    def __contains__(self, tx_id):
+        shard = self._acquire_holding(tx_id)
+        if shard is None:
+            return False
+        shard.lock.release()
+        return True
+
+    @property
+    def contended(self):
+        return sum(shard.contended for shard in self.shards)
+
+
+# Test function
+def test_concurrent_mempool():
+    print("\nTesting ConcurrentPriorityMempool...")
+    import random
+    import sys
+    import time
+    from core.transaction import Transaction
+
+    def run(threads, shards, per_thread=2000):
+        """Submitters add, remove and read back to back; returns (tx/s, contended acquisitions)"""
+        mempool = ConcurrentPriorityMempool(max_size=10**6, shards=shards)
+        kept = [set() for _ in range(threads)]
+
+        def submit(worker):
+            rng = random.Random(worker)
+            mine = []
+            for i in range(per_thread):
+                tx = Transaction(f"sender_{worker}_{i % 50}", f"receiver_{i}", i)
+                assert mempool.add_tx(tx, rng.random(), rng.random() * 5)
+                mine.append(tx.tx_id)
+                if i % 10 == 9:
+                    assert mempool.remove_tx(mine.pop(rng.randrange(len(mine)))) is not None
+                if i % 200 == 0:
+                    top = mempool.snapshot(20)
+                    assert [key for key, _ in top] == sorted((key for key, _ in top), reverse=True)
+            kept[worker].update(mine)
+
+        workers = [threading.Thread(target=submit, args=(w,)) for w in range(threads)]
+        began = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - began
+
+        # Nothing lost, duplicated or left behind
+        expected = set().union(*kept)
+        pending = set()
+        for shard in mempool.shards:
+            ids = set(shard.pool.tx_map)
+            assert not ids & pending
+            pending |= ids
+            live = [ptx for ptx in shard.pool.heap if not ptx.removed]
+            assert len(live) == len(shard.pool)
+        assert pending == expected and len(mempool) == len(expected)
+
+        top = mempool.snapshot(10)
+        every = sorted((ptx.sort_key for shard in mempool.shards for ptx in shard.pool.tx_map.values()),
+                       reverse=True)
+        assert [key for key, _ in top] == every[:10]
+        return threads * per_thread / elapsed, mempool.contended
+
+    # A short switch interval preempts threads while they hold a shard lock,
+    # so lock contention shows up even on one core. Under the GIL the work
+    # inside a lock does not run in parallel, so the table is reported, not
+    # asserted; the isolation check below is what sharding guarantees.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for threads, shards in ((1, 16), (8, 1), (8, 16)):
+            rate, contended = run(threads, shards)
+            print(f"{threads} threads, {shards:>2} shard(s): {rate:>8,.0f} tx/s, "
+                  f"{contended} contended lock acquisitions")
+            if threads == 1:
+                assert contended == 0
+    finally:
+        sys.setswitchinterval(interval)
+
+    def progress_while_held(shards, count=400):
+        """Adds that complete while another writer holds the first shard's lock"""
+        mempool = ConcurrentPriorityMempool(max_size=10**6, shards=shards)
+        held = mempool.shards[0]
+        txs = [Transaction(f"sender_{i}", "receiver", i) for i in range(count)]
+        txs.sort(key=lambda tx: mempool._shard(tx) is held)
+        free = sum(mempool._shard(tx) is not held for tx in txs)
+
+        held.acquire()
+        writer = threading.Thread(target=lambda: [mempool.add_tx(tx, 0.5, 1) for tx in txs])
+        writer.start()
+        writer.join(timeout=2.0)
+        done = len(mempool)
+        assert writer.is_alive() == (free < count)
+        assert len(mempool.snapshot(5)) == min(5, done)    # readers never wait
+        held.lock.release()
+        writer.join()
+        assert len(mempool) == count
+        return done, free
+
+    done, free = progress_while_held(shards=16)
+    print(f"16 shards, one shard locked: {done}/400 adds completed")
+    assert done == free > 0
+    done, free = progress_while_held(shards=1)
+    print(f"one global lock, locked: {done}/400 adds completed")
+    assert done == free == 0
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_concurrent_mempool()
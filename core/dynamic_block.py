@@ -1,45 +1,115 @@
 # core/dynamic_block.py
 from datetime import datetime
 import json
+import math
+import time
+from core.rolling_stats import RollingStats
 
 class DynamicBlockSize:
-    def __init__(self, min_size=1, max_size=10, base_size=2):
+    def __init__(self, min_size=1, max_size=10, base_size=2, windows=(100, 1000), ewma_alpha=0.1):
         self.min_size = min_size
         self.max_size = max_size
         self.base_size = base_size
-        self.history = []
+        # Fixed-size rolling windows instead of an ever-growing list
+        self.history = RollingStats(windows, ewma_alpha, value_range=(min_size, max_size))
+        self.mempool_history = RollingStats(windows, ewma_alpha)
+    
+    @staticmethod
+    def _count(mempool):
+        if hasattr(mempool, '__len__'):
+            return len(mempool)
+        elif hasattr(mempool, 'transactions'):
+            return len(mempool.transactions)
+        return 0
+    
+    def _record(self, size, tx_count, timestamp=None):
+        """Clamp a size to the bounds and add it to the rolling history"""
+        final_size = max(self.min_size, min(self.max_size, size))
+        self.history.push(final_size, timestamp)
+        self.mempool_history.push(tx_count, timestamp)
+        return final_size
     
     def calculate_block_size(self, mempool, network_load=0.5):
-        if hasattr(mempool, 'transactions'):
-            tx_count = len(mempool.transactions)
-        else:
-            tx_count = 0
+        tx_count = self._count(mempool)
         
         mempool_factor = min(tx_count / 100, 1.0)
         network_factor = network_load
         
         dynamic_size = self.base_size * (1 + (mempool_factor * 0.4) + (network_factor * 0.3))
-        final_size = int(round(dynamic_size))
-        final_size = max(self.min_size, min(self.max_size, final_size))
-        
-        self.history.append({
-            'timestamp': datetime.now().isoformat(),
-            'size': final_size,
-            'mempool_size': tx_count
-        })
-        
-        return final_size
+        return self._record(int(round(dynamic_size)), tx_count)
     
     def get_statistics(self):
-        if not self.history:
+        if not len(self.history):
             return None
-        sizes = [h['size'] for h in self.history]
+        recent = zip(self.history.last(5), self.mempool_history.last(5))
         return {
-            'current': sizes[-1] if sizes else self.base_size,
-            'average': sum(sizes) / len(sizes),
-            'history': self.history[-5:]
+            'current': int(self.history.current),
+            'average': self.history.mean(),
+            'ewma': self.history.ewma,
+            'p50': self.history.percentile(50),
+            'p95': self.history.percentile(95),
+            'mempool_average': self.mempool_history.mean(),
+            'windows': self.history.summary(),
+            'history': [
+                {
+                    'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                    'size': int(size),
+                    'mempool_size': int(mempool_size)
+                }
+                for (timestamp, size), (_, mempool_size) in recent
+            ]
         }
 
+class LatencyTargetBlockSize(DynamicBlockSize):
+    """
+    Block sizes chosen to confirm transactions within `target_latency`
+
+    Every call measures how many transactions arrived since the previous
+    one from the mempool's `added` counter (mempools without one only
+    report backlog growth, a lower bound, since nothing says how much of
+    the previous block was actually used) and smooths
+    the arrival rate with an EWMA. The block then takes the transactions
+    expected to arrive during one `block_interval` plus the share of the
+    current backlog that must go now for it to drain within the target.
+    """
+    def __init__(self, min_size=1, max_size=10, base_size=2, target_latency=30.0,
+                 block_interval=10.0, windows=(100, 1000), ewma_alpha=0.3):
+        super().__init__(min_size, max_size, base_size, windows, ewma_alpha)
+        self.target_latency = target_latency
+        self.block_interval = block_interval
+        self.arrival_rate = RollingStats(windows, ewma_alpha)
+        self._last = None  # (time, backlog, added, size) at the previous call
+    
+    def _arrivals(self, mempool, tx_count):
+        added = getattr(mempool, 'added', None)
+        _, backlog, last_added, _ = self._last
+        if added is not None and last_added is not None:
+            return added - last_added
+        return max(0, tx_count - backlog)
+    
+    def calculate_block_size(self, mempool, network_load=0.5, now=None):
+        now = time.time() if now is None else now
+        tx_count = self._count(mempool)
+        
+        if self._last is not None and now > self._last[0]:
+            rate = self._arrivals(mempool, tx_count) / (now - self._last[0])
+            self.arrival_rate.push(rate, now)
+        
+        rate = self.arrival_rate.ewma or 0.0
+        blocks_to_target = max(1.0, self.target_latency / self.block_interval)
+        wanted = rate * self.block_interval + tx_count / blocks_to_target
+        final_size = self._record(math.ceil(wanted), tx_count, now)
+        
+        self._last = (now, tx_count, getattr(mempool, 'added', None), final_size)
+        return final_size
+    
+    def get_statistics(self):
+        stats = super().get_statistics()
+        if stats is not None:
+            stats['arrival_rate'] = self.arrival_rate.ewma
+            stats['target_latency'] = self.target_latency
+        return stats
+
 def test_dynamic_block():
     print("Testing DynamicBlockSize...")
     class MockMempool:
@@ -54,6 +124,30 @@ def test_dynamic_block():
         block_size = calculator.calculate_block_size(mempool)
         print(f"Mempool: {size} -> Block size: {block_size}")
     
+    stats = calculator.get_statistics()
+    print(f"Average: {stats['average']:.2f}, EWMA: {stats['ewma']:.2f}, p50: {stats['p50']}, p95: {stats['p95']}")
+    assert [h['mempool_size'] for h in stats['history']] == sizes
+    
+    # A steady 1 tx/s with 10 s blocks: every block clears what arrived
+    controller = LatencyTargetBlockSize(max_size=50, target_latency=30, block_interval=10)
+    mempool = MockMempool(0)
+    mempool.added = 0
+    for block in range(20):
+        mempool.transactions += ['tx'] * 10
+        mempool.added += 10
+        size = controller.calculate_block_size(mempool, now=block * 10.0)
+        del mempool.transactions[:size]
+    print(f"Controller: size {size}, arrival rate {controller.arrival_rate.ewma:.2f} tx/s, backlog {len(mempool.transactions)}")
+    assert abs(controller.arrival_rate.ewma - 1.0) < 1e-6 and not mempool.transactions
+    
+    # Without a counter only growth counts: an idle mempool that mined
+    # nothing reports no arrivals instead of a phantom block's worth
+    controller = LatencyTargetBlockSize(max_size=50, target_latency=30, block_interval=10)
+    mempool = MockMempool(20)
+    for block in range(5):
+        controller.calculate_block_size(mempool, now=block * 10.0)
+    assert controller.arrival_rate.ewma == 0.0
+    
     print("Test completed!")
 
 if __name__ == "__main__":
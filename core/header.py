@@ -0,0 +1,57 @@
+# core/header.py
+
+import hashlib
+import struct
+import time
+
+from core.mining import NONCE
+
+# version, prev hash, merkle root, timestamp, difficulty (the nonce follows)
+HEADER_PREFIX = struct.Struct(">I32s32sdI")
+HEADER_SIZE = HEADER_PREFIX.size + NONCE.size
+
+VERSION = 1
+
+
+def hash_bytes(value):
+    """32-byte form of a hex block hash ("0" and other short ids are zero-padded)"""
+    if isinstance(value, bytes):
+        return value.rjust(32, b"\0")
+    try:
+        return bytes.fromhex(value.rjust(64, "0"))
+    except ValueError:
+        return hashlib.sha256(value.encode()).digest()
+
+
+class BlockHeader:
+    """Fixed-size block header; PoW and block ids hash only these 88 bytes"""
+
+    def __init__(self, prev_hash, merkle_root, timestamp=None, difficulty=0, nonce=0, version=VERSION):
+        self.version = version
+        self.prev_hash = prev_hash
+        self.merkle_root = merkle_root
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.difficulty = difficulty
+        self.nonce = nonce
+
+    def prefix(self):
+        """Header bytes without the nonce (the fixed part the miner hashes once)"""
+        return HEADER_PREFIX.pack(
+            self.version,
+            hash_bytes(self.prev_hash),
+            self.merkle_root,
+            self.timestamp,
+            self.difficulty
+        )
+
+    def serialize(self):
+        return self.prefix() + NONCE.pack(self.nonce)
+
+    @classmethod
+    def deserialize(cls, data):
+        version, prev_hash, merkle_root, timestamp, difficulty = HEADER_PREFIX.unpack_from(data)
+        (nonce,) = NONCE.unpack_from(data, HEADER_PREFIX.size)
+        return cls(prev_hash.hex(), merkle_root, timestamp, difficulty, nonce, version)
+
+    def hash(self):
+        return hashlib.sha256(self.serialize()).hexdigest()
@@ -1,14 +1,85 @@
 # core/history.py
 
+import atexit
 import json
+import os
+import threading
+import time
+from array import array
 from datetime import datetime
+from core.history_index import HistoryIndex, to_epoch
+from core.history_segments import SegmentManifest, SegmentCompressor
 
 class TxHistory:
-    def __init__(self, log_file="tx_history.json"):
+    """
+    Append-only transaction log, one JSON record per line
+
+    log_tx() only appends to an in-memory buffer; the buffer is written
+    with a single write (group commit) once it holds `flush_bytes` or is
+    `flush_interval` seconds old, and fsync'ed after the write if `fsync`
+    is set. The byte offset of every record and the position of every tx
+    id are indexed in memory and rebuilt with one scan on startup, so
+    logging costs the same per transaction however long the log gets and
+    nothing is ever dropped. Whatever is still buffered is written by
+    close(), which also runs at interpreter exit.
+
+    Files in the old format (one JSON array) are converted on load.
+
+    With `index_file`, every group commit is also written to a SQLite
+    HistoryIndex in one transaction, and query() answers sender, receiver,
+    tx id and time range lookups from it; on startup the index catches up
+    with whatever the log holds beyond what it has seen.
+
+    With `segment_bytes` and/or `segment_seconds` the log rotates: the
+    active file is renamed to `<log_file>.NNNNN` once it reaches that size
+    or age, listed in a SegmentManifest with its record and time range,
+    and gzipped by a background SegmentCompressor. Only the active segment
+    is scanned and indexed in memory, so startup time and memory stay
+    bounded by the segment size; older records are read back through the
+    manifest, which lets scan() skip segments outside a time range.
+    """
+    def __init__(self, log_file="tx_history.json", flush_bytes=64 * 1024, flush_interval=1.0,
+                 fsync=False, verbose=True, index_file=None, segment_bytes=None,
+                 segment_seconds=None, compress=True, merge_bytes=None):
         self.log_file = log_file
-        self.all_txs = []
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.verbose = verbose
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+
+        # Closed segments; the active segment continues after them
+        self.manifest = SegmentManifest(log_file)
+        self.compressor = None
+        if compress and (segment_bytes or segment_seconds):
+            self.compressor = SegmentCompressor(self.manifest, merge_bytes or segment_bytes)
+
+        self.offsets = array('Q')  # record number in the active segment -> byte offset
+        self.by_id = {}            # tx id -> global record number of its latest record
+        self.buffer = bytearray()  # records not yet written
+        self.pending = []          # (log position, record) of the buffered records, for the index
+        self.flushed = 0           # bytes of the active segment already written
+        self.first_ts = None       # time range of the active segment
+        self.last_ts = None
+        self.segment_started = time.time()
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.index = HistoryIndex(index_file) if index_file else None
+        self._recover_segments()
         self.load_history()
-    
+
+        self.file = open(self.log_file, 'a+b')
+        if self.compressor is not None:
+            for entry in self.manifest.entries():
+                if not entry["compressed"]:
+                    self.compressor.submit(entry["number"])
+        self._closed = threading.Event()
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
     def log_tx(self, tx):
         """Log transaction to history"""
         tx_record = {
@@ -19,46 +90,324 @@ class TxHistory:
             "timestamp": getattr(tx, 'timestamp', datetime.now().isoformat()),
             "log_time": datetime.now().isoformat()
         }
-        
-        self.all_txs.append(tx_record)
-        self.save_history()
-        print(f"[HISTORY] Transaction logged: {tx_record['id']}")
+        line = json.dumps(tx_record, default=str).encode() + b"\n"
+        ts = _record_time(tx_record)
+
+        with self.lock:
+            if self._should_rotate():
+                self._rotate()
+            offset = self.flushed + len(self.buffer)
+            self._index(tx_record["id"], offset, ts)
+            if self.index is not None:
+                self.pending.append((self.manifest_bytes + offset, tx_record))
+            self.buffer += line
+            if (len(self.buffer) >= self.flush_bytes
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self._flush()
+
+        if self.verbose:
+            print(f"[HISTORY] Transaction logged: {tx_record['id']}")
         return tx_record
-    
+
+    def _index(self, tx_id, offset, ts):
+        self.by_id[tx_id] = self.base + len(self.offsets)
+        self.offsets.append(offset)
+        if ts is not None:
+            self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+            self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+    def _flush(self):
+        """Write the buffered records in one go; caller holds the lock"""
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.flushed += len(self.buffer)
+            self.buffer.clear()
+            if self.index is not None:
+                self.index.add(self.pending, self.manifest_bytes + self.flushed)
+                self.pending = []
+        self.last_flush = time.monotonic()
+
+    # Segments ---------------------------------------------------------
+
+    def _should_rotate(self):
+        if not self.offsets:
+            return False
+        if self.segment_bytes and self.flushed + len(self.buffer) >= self.segment_bytes:
+            return True
+        return bool(self.segment_seconds) and time.time() - self.segment_started >= self.segment_seconds
+
+    def _rotate(self):
+        """Close the active segment and start a new one; caller holds the lock"""
+        self._flush()
+        self.file.close()
+        number = self.manifest.next_number()
+        os.replace(self.log_file, self.manifest.segment_path(number))
+        self.manifest.add(self._entry(number, self.base, len(self.offsets), self.flushed,
+                                      self.first_ts, self.last_ts))
+
+        self.base += len(self.offsets)
+        self.manifest_bytes += self.flushed
+        self.offsets = array('Q')
+        self.by_id = {}
+        self.flushed = 0
+        self.first_ts = self.last_ts = None
+        self.segment_started = time.time()
+        self.file = open(self.log_file, 'a+b')
+        if self.compressor is not None:
+            self.compressor.submit(number)
+
+    @staticmethod
+    def _entry(number, first_record, count, raw_bytes, first_ts, last_ts):
+        return {
+            "number": number, "first_record": first_record, "count": count,
+            "raw_bytes": raw_bytes, "stored_bytes": raw_bytes,
+            "first_ts": first_ts, "last_ts": last_ts, "compressed": False
+        }
+
+    def _recover_segments(self):
+        """List segments that were renamed but not yet recorded (crash during rotation)"""
+        while os.path.exists(self.manifest.segment_path(self.manifest.next_number())):
+            number = self.manifest.next_number()
+            path = self.manifest.segment_path(number)
+            with open(path, 'rb') as f:
+                data = f.read()
+            records = _parse_records(data)
+            data = _drop_corrupted(path, data, records)
+            times = [ts for ts in (_record_time(record) for _, _, record in records) if ts is not None]
+            self.manifest.add(self._entry(number, self.manifest.record_count, len(records),
+                                          len(data), min(times, default=None),
+                                          max(times, default=None)))
+            print(f"[HISTORY] Recovered segment {number}")
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self.lock:
+                if self.buffer and not self.file.closed:
+                    self._flush()
+
     def save_history(self):
-        """Save history to JSON file"""
+        """Write out everything logged so far"""
         try:
-            with open(self.log_file, 'w') as f:
-                json.dump(self.all_txs[-1000:], f, indent=2)
+            with self.lock:
+                self._flush()
         except Exception as e:
             print(f"[ERROR] Saving history: {e}")
-    
+
+    flush = save_history
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        atexit.unregister(self.close)
+        with self.lock:
+            self._flush()
+            self.file.close()
+            if self.index is not None:
+                self.index.close()
+        if self.compressor is not None:
+            self.compressor.stop()
+
     def load_history(self):
-        """Load history from JSON file"""
+        """Rebuild the record index of the active segment from the log file"""
+        self.base = self.manifest.record_count
+        self.manifest_bytes = self.manifest.raw_bytes
         try:
-            with open(self.log_file, 'r') as f:
-                self.all_txs = json.load(f)
-            print(f"[HISTORY] Loaded {len(self.all_txs)} transactions")
+            with open(self.log_file, 'rb') as f:
+                data = f.read()
         except FileNotFoundError:
             print("[HISTORY] No previous history found")
-            self.all_txs = []
+            return
+
+        if data.lstrip()[:1] == b'[':
+            data = self._convert_legacy(data)
+
+        # A record without its newline is a torn write; drop it
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            print(f"[HISTORY] Dropping {len(data) - end} bytes of an incomplete record")
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(end)
+
+        indexed = self.index.log_offset - self.manifest_bytes if self.index is not None else end
+        records = _parse_records(data[:end])
+        # Corrupted lines are dropped from the file now, so record N of a
+        # segment is always line N once it is closed
+        compacted = _drop_corrupted(self.log_file, data[:end], records)
+        dropped = len(compacted) != end
+        catch_up = []
+        offset = 0
+        for start, stop, record in records:
+            self._index(record["id"], offset, _record_time(record))
+            if start >= indexed:
+                catch_up.append((self.manifest_bytes + offset, record))
+            offset += stop - start
+        end = len(compacted)
+        self.flushed = end
+        if records:
+            # The active segment's age counts from its first record
+            self.segment_started = to_epoch(records[0][2].get("log_time")) or time.time()
+        if catch_up or (self.index is not None and dropped):
+            self.index.add(catch_up, self.manifest_bytes + end)
+            if catch_up:
+                print(f"[HISTORY] Indexed {len(catch_up)} transactions missing from {self.index.db_file}")
+        print(f"[HISTORY] Loaded {len(self)} transactions ({len(self.manifest.segments)} closed segments)")
+
+    def _convert_legacy(self, data):
+        try:
+            records = json.loads(data)
         except json.JSONDecodeError:
             print("[HISTORY] Corrupted history file, starting fresh")
-            self.all_txs = []
-    
+            records = []
+        data = b"".join(json.dumps(record, default=str).encode() + b"\n" for record in records)
+        temp = self.log_file + ".tmp"
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, self.log_file)
+        return data
+
+    # Reads ------------------------------------------------------------
+
+    def _read(self, number):
+        """Record `number` of the active segment; caller holds the lock"""
+        start = self.offsets[number]
+        # Skipped corrupt lines may sit before the next record, so the
+        # record ends at its own newline
+        end = self.offsets[number + 1] if number + 1 < len(self.offsets) else self.flushed + len(self.buffer)
+        if start >= self.flushed:
+            line = self.buffer[start - self.flushed:end - self.flushed]
+        else:
+            line = os.pread(self.file.fileno(), end - start, start)
+        return json.loads(line[:line.index(b"\n")])
+
+    def _read_closed(self, number):
+        entry = self.manifest.find(number)
+        lines = self.manifest.lines(entry)
+        return json.loads(lines[number - entry["first_record"]])
+
+    def get(self, tx_id):
+        """Latest record logged for a tx id, or None"""
+        with self.lock:
+            number = self.by_id.get(tx_id)
+            if number is not None:
+                return self._read(number - self.base)
+        if self.index is not None:
+            records, _ = self.query(tx_id=tx_id, limit=1, descending=True)
+            return records[0] if records else None
+        # No index: closed segments, newest first
+        for entry in reversed(self.manifest.entries()):
+            for line in reversed(self.manifest.lines(entry)):
+                record = json.loads(line)
+                if record.get("id") == tx_id:
+                    return record
+        return None
+
+    def __getitem__(self, number):
+        with self.lock:
+            if number < 0:
+                number += len(self)
+            if not 0 <= number < len(self):
+                raise IndexError("history record out of range")
+            if number >= self.base:
+                return self._read(number - self.base)
+        return self._read_closed(number)
+
+    def scan(self, start=None, end=None):
+        """Records with a timestamp in [start, end), skipping segments outside the range"""
+        start, end = to_epoch(start), to_epoch(end)
+        for entry in self.manifest.entries(start, end):
+            for line in self.manifest.lines(entry):
+                record = json.loads(line)
+                if _in_range(record, start, end):
+                    yield record
+        with self.lock:
+            active = [self._read(number) for number in range(len(self.offsets))]
+        for record in active:
+            if _in_range(record, start, end):
+                yield record
+
+    @property
+    def disk_bytes(self):
+        """Bytes on disk: closed segments as stored plus the active segment"""
+        return self.manifest.stored_bytes + self.flushed
+
+    def query(self, **criteria):
+        """HistoryIndex.query over everything logged so far; needs index_file"""
+        if self.index is None:
+            raise ValueError("TxHistory was opened without an index_file")
+        self.save_history()
+        with self.lock:
+            return self.index.query(**criteria)
+
+    def __len__(self):
+        return self.base + len(self.offsets)
+
+    def __iter__(self):
+        for entry in self.manifest.entries():
+            for line in self.manifest.lines(entry):
+                yield json.loads(line)
+        with self.lock:
+            active = [self._read(number) for number in range(len(self.offsets))]
+        yield from active
+
     def print_stats(self):
         """Print statistics about transaction history"""
         print("\n=== TRANSACTION HISTORY STATS ===")
-        print(f"Total transactions: {len(self.all_txs)}")
-        if self.all_txs:
-            print(f"Last transaction: {self.all_txs[-1]['timestamp']}")
-            print(f"First transaction: {self.all_txs[0]['timestamp']}")
+        print(f"Total transactions: {len(self)}")
+        if len(self):
+            print(f"Last transaction: {self[-1]['timestamp']}")
+            print(f"First transaction: {self[0]['timestamp']}")
+
+def _parse_records(data):
+    """(start, end, record) of every valid line; corrupted lines are reported and left out"""
+    records = []
+    offset = 0
+    while offset < len(data):
+        newline = data.index(b"\n", offset)
+        try:
+            record = json.loads(data[offset:newline])
+            record["id"]
+        except (ValueError, KeyError, TypeError):
+            print(f"[HISTORY] Skipping corrupted record at byte {offset}")
+        else:
+            records.append((offset, newline + 1, record))
+        offset = newline + 1
+    return records
+
+def _drop_corrupted(path, data, records):
+    """Rewrite a log file with only its valid lines; returns its new contents"""
+    if sum(end - start for start, end, _ in records) == len(data):
+        return data
+    data = b"".join(data[start:end] for start, end, _ in records)
+    temp = path + ".tmp"
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+    return data
+
+def _record_time(record):
+    return to_epoch(record.get("timestamp")) or to_epoch(record.get("log_time"))
+
+def _in_range(record, start, end):
+    ts = _record_time(record)
+    if ts is None:
+        return start is None and end is None
+    return (start is None or ts >= start) and (end is None or ts < end)
 
 # Test function
 def test_history():
     print("\nTesting TxHistory class...")
-    history = TxHistory("test_history.json")
-    
+    log_file = "test_history.jsonl"
+    # Start from a file in the old single-array format
+    with open(log_file, "w") as f:
+        json.dump([{"id": "legacy_tx", "sender": "alice", "receiver": "bob", "amount": 1,
+                    "timestamp": "2025-01-01T00:00:00", "log_time": "2025-01-01T00:00:00"}], f, indent=2)
+    history = TxHistory(log_file)
+    assert history.get("legacy_tx")["amount"] == 1
+
     # Create a mock transaction
     class MockTx:
         def __init__(self):
@@ -67,16 +416,127 @@ def test_history():
             self.receiver = "bob"
             self.amount = 100
             self.timestamp = datetime.now().isoformat()
-    
+
     # Log some transactions
     for i in range(5):
         tx = MockTx()
         tx.tx_id = f"test_tx_{i}"
         history.log_tx(tx)
-    
+
     history.print_stats()
+
+    # Bulk logging: constant cost per tx, nothing capped
+    history.verbose = False
+    count = 50000
+    began = time.perf_counter()
+    for i in range(count):
+        tx = MockTx()
+        tx.tx_id = f"bulk_tx_{i}"
+        tx.amount = i
+        history.log_tx(tx)
+    elapsed = time.perf_counter() - began
+    print(f"Logged {count} transactions at {count / elapsed:,.0f} tx/s")
+    assert history.get("bulk_tx_123")["amount"] == 123
+    history.close()
+
+    # Reopen: the index is rebuilt from the file, skipping a corrupt line
+    with open(log_file, "ab") as f:
+        f.write(b'not json\n')
+    history = TxHistory(log_file, verbose=False)
+    history.log_tx(MockTx())
+    history.close()
+    with open(log_file, "ab") as f:
+        f.write(b'{"id": "torn')
+    index_file = "test_history_index.db"
+    history = TxHistory(log_file, verbose=False, index_file=index_file)
+    assert len(history) == count + 7
+    assert history.get("bulk_tx_49999")["amount"] == 49999
+    assert history[1]["id"] == "test_tx_0"
+
+    # The index caught up with the log; new records reach it on each flush
+    tx = MockTx()
+    tx.tx_id, tx.sender = "indexed_tx", "carol"
+    history.log_tx(tx)
+    records, cursor = history.query(sender="carol")
+    assert [r["id"] for r in records] == ["indexed_tx"] and cursor is None
+    page, cursor = history.query(sender="alice", limit=1000)
+    assert len(page) == 1000 and cursor is not None
+    history.close()
+    os.remove(log_file)
+
+    # Buffered records are written at exit even without close()
+    import subprocess
+    import sys
+    script = ("from core.history import TxHistory; h = TxHistory(%r, verbose=False, flush_interval=60); "
+              "[h.log_tx(type('Tx', (), {'tx_id': f'exit_{i}'})()) for i in range(10)]" % log_file)
+    subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.DEVNULL)
+    history = TxHistory(log_file, verbose=False)
+    assert len(history) == 10 and history.get("exit_9") is not None
+    history.close()
+    os.remove(log_file)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(index_file + suffix):
+            os.remove(index_file + suffix)
+
+    # Segmented: rotation by size, background compression, time-range skips
+    import glob
+    log_file = "test_history_seg.jsonl"
+    history = TxHistory(log_file, verbose=False, segment_bytes=256 * 1024, merge_bytes=1024 * 1024)
+    for i in range(count):
+        tx = MockTx()
+        tx.tx_id, tx.amount, tx.timestamp = f"seg_tx_{i}", i, 1_700_000_000 + i
+        history.log_tx(tx)
+    history.flush()
+    history.compressor.wait()
+    raw_bytes = history.manifest.raw_bytes + history.flushed
+    print(f"Segments: {len(history.manifest.segments)} closed, "
+          f"{history.disk_bytes:,} bytes on disk for {raw_bytes:,} logged")
+    assert all(entry["compressed"] for entry in history.manifest.segments)
+    assert history.disk_bytes < raw_bytes / 3
+    # Merged segments give up their files, never their numbers
+    rotations = history.manifest.next_number()
+    assert rotations > len(history.manifest.segments)
+    assert sorted(glob.glob(log_file + ".0*")) == [
+        history.manifest.segment_path(entry["number"], compressed=True) for entry in history.manifest.segments]
+    history.close()
+    assert SegmentManifest(log_file).next_number() == rotations
+
+    history = TxHistory(log_file, verbose=False, segment_bytes=256 * 1024)
+    assert len(history) == count
+    assert history[123]["amount"] == 123 and history[-1]["amount"] == count - 1
+    assert history.get("seg_tx_7")["amount"] == 7
+    window = list(history.scan(1_700_000_000 + 20000, 1_700_000_000 + 20100))
+    assert [r["amount"] for r in window] == list(range(20000, 20100))
+    assert len(history.manifest.entries(1_700_000_000 + 20000, 1_700_000_000 + 20100)) == 1
+    history.close()
+
+    # Corrupted lines (the first one included) never shift closed records
+    for path in glob.glob(log_file + "*"):
+        os.remove(path)
+    with open(log_file, "wb") as f:
+        f.write(b'garbage\n')
+        for i in range(3):
+            f.write(json.dumps({"id": f"kept_{i}", "log_time": "2025-01-01T00:00:00"}).encode() + b"\n")
+            f.write(b'{"torn": \n')
+    history = TxHistory(log_file, verbose=False, segment_bytes=1, compress=False)
+    assert [record["id"] for record in history] == ["kept_0", "kept_1", "kept_2"]
+    history.log_tx(MockTx())  # seals the recovered records as a segment
+    assert len(history.manifest.segments) == 1
+    assert [history[n]["id"] for n in range(4)] == ["kept_0", "kept_1", "kept_2", "test_tx_123"]
+    history.close()
+
+    # Rotation by age
+    for path in glob.glob(log_file + "*"):
+        os.remove(path)
+    history = TxHistory(log_file, verbose=False, segment_seconds=0.05, compress=False)
+    history.log_tx(MockTx())
+    time.sleep(0.06)
+    history.log_tx(MockTx())
+    assert history.manifest.record_count == 1 and len(history) == 2
+    history.close()
+    for path in glob.glob(log_file + "*"):
+        os.remove(path)
     print("Test completed!")
 
 if __name__ == "__main__":
     test_history()
-
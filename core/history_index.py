@@ -0,0 +1,225 @@
+# core/history_index.py
+
+import sqlite3
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS txs (
+    seq        INTEGER PRIMARY KEY,
+    tx_id      TEXT,
+    sender     TEXT,
+    receiver   TEXT,
+    amount,
+    timestamp,
+    ts         REAL,
+    log_time   TEXT,
+    log_offset INTEGER
+);
+CREATE INDEX IF NOT EXISTS txs_sender ON txs (sender, ts, seq);
+CREATE INDEX IF NOT EXISTS txs_receiver ON txs (receiver, ts, seq);
+CREATE INDEX IF NOT EXISTS txs_tx_id ON txs (tx_id);
+CREATE INDEX IF NOT EXISTS txs_ts ON txs (ts, seq);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+"""
+
+COLUMNS = ("tx_id", "sender", "receiver", "amount", "timestamp", "log_time")
+
+
+def to_epoch(value):
+    """Seconds since the epoch for a float timestamp or an ISO string; None if unknown"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def encode_cursor(ts, seq):
+    """Cursor for the row (ts, seq); ts is None for records without a time"""
+    return f"{ts!r}:{seq}"
+
+
+def decode_cursor(cursor):
+    ts, seq = cursor.rsplit(":", 1)
+    return (None if ts == "None" else float(ts)), int(seq)
+
+
+def _after_cursor(ts, seq, descending):
+    """
+    WHERE clause for the rows after (ts, seq) in (ts, seq) order
+
+    SQLite sorts NULL ts first, but a row-value comparison against NULL is
+    never true, so rows without a time are matched explicitly.
+    """
+    if ts is None:
+        if descending:
+            return "(ts IS NULL AND seq < ?)", [seq]
+        return "(ts IS NOT NULL OR seq > ?)", [seq]
+    if descending:
+        return "((ts, seq) < (?, ?) OR ts IS NULL)", [ts, seq]
+    return "(ts, seq) > (?, ?)", [ts, seq]
+
+
+class HistoryIndex:
+    """
+    SQLite (WAL mode) index over TxHistory records
+
+    Records are indexed by sender, receiver, tx id and timestamp, each
+    index ordered by (ts, seq) so a query is one index range scan. Pages
+    are keyset-paginated: the cursor is the (ts, seq) of the last row
+    returned, so page N costs the same as page 1. `log_offset` records how
+    much of the log is indexed, which lets TxHistory catch up on startup.
+    """
+
+    def __init__(self, db_file="tx_history.db"):
+        self.db_file = db_file
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    @property
+    def log_offset(self):
+        """Log bytes already indexed"""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'log_offset'").fetchone()
+        return row[0] if row else 0
+
+    def add(self, entries, log_offset):
+        """Index (offset, record) pairs in one transaction; log_offset = log bytes covered after them"""
+        rows = [
+            (record.get("id"), record.get("sender"), record.get("receiver"), record.get("amount"),
+             record.get("timestamp"),
+             to_epoch(record.get("timestamp")) or to_epoch(record.get("log_time")),
+             record.get("log_time"), offset)
+            for offset, record in entries
+        ]
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO txs (tx_id, sender, receiver, amount, timestamp, ts, log_time, log_offset)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('log_offset', ?)", (log_offset,))
+
+    def query(self, sender=None, receiver=None, address=None, tx_id=None, start=None, end=None,
+              limit=100, cursor=None, descending=False):
+        """
+        One page of matching records, oldest first (newest first if descending)
+
+        start/end bound the timestamp (epoch seconds or ISO strings, end
+        exclusive). Returns (records, next_cursor); next_cursor is None on
+        the last page.
+        """
+        conditions, params = [], []
+        if sender is not None:
+            conditions.append("sender = ?")
+            params.append(sender)
+        if receiver is not None:
+            conditions.append("receiver = ?")
+            params.append(receiver)
+        if address is not None:
+            conditions.append("(sender = ? OR receiver = ?)")
+            params += [address, address]
+        if tx_id is not None:
+            conditions.append("tx_id = ?")
+            params.append(tx_id)
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(to_epoch(start))
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(to_epoch(end))
+        if cursor is not None:
+            condition, values = _after_cursor(*decode_cursor(cursor), descending)
+            conditions.append(condition)
+            params += values
+
+        order = "DESC" if descending else "ASC"
+        sql = (f"SELECT seq, ts, {', '.join(COLUMNS)} FROM txs"
+               + (" WHERE " + " AND ".join(conditions) if conditions else "")
+               + f" ORDER BY ts {order}, seq {order} LIMIT ?")
+        rows = self.db.execute(sql, params + [limit + 1]).fetchall()
+
+        records = [
+            {"id": tx, "sender": s, "receiver": r, "amount": a, "timestamp": t, "log_time": lt}
+            for _, _, tx, s, r, a, t, lt in rows[:limit]
+        ]
+        next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+        return records, next_cursor
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM txs").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+# Test function
+def test_history_index():
+    print("\nTesting HistoryIndex...")
+    import os
+    import random
+    import time
+
+    db_file = "test_history_index.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+
+    rng = random.Random(9)
+    index = HistoryIndex(db_file)
+    total = 200000
+    began = time.perf_counter()
+    batch = []
+    for i in range(total):
+        record = {"id": f"tx_{i}", "sender": f"addr_{rng.randrange(5000)}",
+                  "receiver": f"addr_{rng.randrange(5000)}", "amount": i,
+                  "timestamp": 1_700_000_000 + i, "log_time": None}
+        batch.append((i * 100, record))
+        if len(batch) == 10000:
+            index.add(batch, (i + 1) * 100)
+            batch = []
+    print(f"Indexed {total} records in {time.perf_counter() - began:.1f}s")
+
+    # Page through one address and compare with a plain scan
+    began = time.perf_counter()
+    page, cursor = index.query(sender="addr_42", limit=5)
+    lookup = (time.perf_counter() - began) * 1000
+    seen = list(page)
+    while cursor:
+        page, cursor = index.query(sender="addr_42", limit=5, cursor=cursor)
+        seen += page
+    expected = [row[0] for row in index.db.execute("SELECT tx_id FROM txs WHERE sender = 'addr_42' ORDER BY seq")]
+    assert [record["id"] for record in seen] == expected
+    print(f"Sender lookup: {lookup:.2f} ms for the first page, {len(seen)} txs in total")
+
+    window, _ = index.query(address="addr_7", start=1_700_050_000, end=1_700_150_000, limit=1000)
+    assert all(1_700_050_000 <= r["timestamp"] < 1_700_150_000 for r in window)
+    assert all("addr_7" in (r["sender"], r["receiver"]) for r in window)
+    newest, _ = index.query(receiver="addr_9", limit=3, descending=True)
+    assert [r["timestamp"] for r in newest] == sorted((r["timestamp"] for r in newest), reverse=True)
+    assert index.query(tx_id="tx_123")[0][0]["amount"] == 123
+    assert index.log_offset == total * 100
+
+    # Records without a usable time (ts NULL) page like any other
+    index.add([(0, {"id": f"untimed_{i}", "sender": "addr_untimed", "timestamp": None})
+               for i in range(5)] + [(0, {"id": "timed", "sender": "addr_untimed", "timestamp": 1})],
+              index.log_offset)
+    for descending in (False, True):
+        page, cursor = index.query(sender="addr_untimed", limit=2, descending=descending)
+        seen = list(page)
+        while cursor:
+            page, cursor = index.query(sender="addr_untimed", limit=2, cursor=cursor, descending=descending)
+            seen += page
+        ids = [f"untimed_{i}" for i in range(5)] + ["timed"]
+        assert [r["id"] for r in seen] == (ids[::-1] if descending else ids)
+
+    index.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_history_index()
@@ -0,0 +1,185 @@
+# core/history_segments.py
+
+import bisect
+import gzip
+import json
+import os
+import queue
+import threading
+
+
+class SegmentManifest:
+    """
+    Closed segments of a TxHistory log
+
+    Each entry records a segment's file, the record numbers and time range
+    it covers and its raw and stored size, so readers can pick the
+    segments a query needs without opening the others. The manifest is
+    rewritten atomically (temp file + rename) on every change. Segment
+    numbers come from a persisted counter and are never reused, even
+    after a merge removes the last entry.
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.path = log_file + ".manifest.json"
+        self.lock = threading.Lock()
+        self.segments = []
+        self.next_segment = 0
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        self.segments = data["segments"]
+        # Manifests written before the counter existed
+        last = self.segments[-1]["number"] + 1 if self.segments else 0
+        self.next_segment = max(data.get("next_segment", 0), last)
+
+    def save(self):
+        """Persist the manifest; caller holds the lock"""
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({"next_segment": self.next_segment, "segments": self.segments}, f, indent=1)
+        os.replace(temp, self.path)
+
+    def segment_path(self, number, compressed=False):
+        return f"{self.log_file}.{number:05d}" + (".gz" if compressed else "")
+
+    @property
+    def record_count(self):
+        last = self.segments[-1] if self.segments else None
+        return last["first_record"] + last["count"] if last else 0
+
+    @property
+    def raw_bytes(self):
+        return sum(entry["raw_bytes"] for entry in self.segments)
+
+    @property
+    def stored_bytes(self):
+        return sum(entry["stored_bytes"] for entry in self.segments)
+
+    def next_number(self):
+        return self.next_segment
+
+    def add(self, entry):
+        with self.lock:
+            self.segments.append(entry)
+            self.next_segment = max(self.next_segment, entry["number"] + 1)
+            self.save()
+
+    def entries(self, start=None, end=None):
+        """Entries whose time range overlaps [start, end); unknown ranges always match"""
+        with self.lock:
+            segments = list(self.segments)
+        return [
+            entry for entry in segments
+            if entry["first_ts"] is None
+            or ((start is None or entry["last_ts"] >= start) and (end is None or entry["first_ts"] < end))
+        ]
+
+    def find(self, record):
+        """Entry holding a global record number"""
+        with self.lock:
+            starts = [entry["first_record"] for entry in self.segments]
+            i = bisect.bisect_right(starts, record) - 1
+            return dict(self.segments[i]) if i >= 0 else None
+
+    def lines(self, entry):
+        """Raw record lines of an entry, even if the compressor replaced its file meanwhile"""
+        first, count = entry["first_record"], entry["count"]
+        for _ in range(3):
+            try:
+                path = self.segment_path(entry["number"], entry["compressed"])
+                opener = gzip.open if entry["compressed"] else open
+                with opener(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                entry = self.find(first)
+                continue
+            lines = data.splitlines()
+            skip = first - entry["first_record"]
+            return lines[skip:skip + count]
+        raise FileNotFoundError(f"segment with record {first} is missing")
+
+
+class SegmentCompressor:
+    """
+    Background thread that gzips closed segments
+
+    A compressed segment whose raw size, added to its predecessor's, stays
+    within `merge_bytes` is appended to it (gzip allows concatenated
+    members), so time-based rotation does not leave thousands of tiny
+    files behind.
+    """
+
+    def __init__(self, manifest, merge_bytes=None, level=6):
+        self.manifest = manifest
+        self.merge_bytes = merge_bytes
+        self.level = level
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, number):
+        self.queue.put(number)
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def wait(self):
+        """Block until every submitted segment is compressed"""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            number = self.queue.get()
+            try:
+                if number is None:
+                    return
+                self._compress(number)
+            except Exception as e:
+                print(f"[HISTORY] Compressing segment {number} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _compress(self, number):
+        manifest = self.manifest
+        raw = manifest.segment_path(number)
+        packed = manifest.segment_path(number, compressed=True)
+        with open(raw, "rb") as f:
+            data = gzip.compress(f.read(), self.level)
+        with open(packed + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(packed + ".tmp", packed)
+
+        with manifest.lock:
+            i = next(i for i, entry in enumerate(manifest.segments) if entry["number"] == number)
+            entry = manifest.segments[i]
+            entry["compressed"] = True
+            entry["stored_bytes"] = len(data)
+            previous = manifest.segments[i - 1] if i else None
+            merge = (self.merge_bytes and previous is not None and previous["compressed"]
+                     and previous["raw_bytes"] + entry["raw_bytes"] <= self.merge_bytes)
+            if merge:
+                target = manifest.segment_path(previous["number"], compressed=True)
+                with open(target, "rb") as f:
+                    merged = f.read() + data
+                with open(target + ".tmp", "wb") as f:
+                    f.write(merged)
+                os.replace(target + ".tmp", target)
+                previous["count"] += entry["count"]
+                previous["raw_bytes"] += entry["raw_bytes"]
+                previous["stored_bytes"] = len(merged)
+                for key, pick in (("first_ts", min), ("last_ts", max)):
+                    known = [value for value in (previous[key], entry[key]) if value is not None]
+                    previous[key] = pick(known) if known else None
+                del manifest.segments[i]
+            manifest.save()
+
+            # Only now does nothing point at them; still under the lock, so
+            # a reader retrying through find() sees the new entry
+            os.remove(raw)
+            if merge:
+                os.remove(packed)
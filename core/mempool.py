@@ -1,6 +1,118 @@
+# core/mempool.py
+
+from core.codec import encode_transaction
+
+def _key(tx):
+    tx_id = getattr(tx, 'tx_id', None)
+    return tx_id if tx_id is not None else id(tx)
+
 class Mempool:
+    """
+    Pending transactions indexed by tx_id
+
+    Every operation touches only the transactions involved: duplicates are
+    rejected with one dict lookup, and removing the contents of a mined
+    block costs O(block size) regardless of how many transactions wait.
+    """
+
     def __init__(self):
-        self.transactions = []
+        self.by_id = {}       # tx_id -> tx, in arrival order
+        self.by_sender = {}   # sender -> {tx_id: tx}, in arrival order
+        self.sizes = {}       # tx_id -> encoded size in bytes
+        self.total_bytes = 0
+        self.added = 0        # transactions ever accepted (arrival counter)
+
+    @property
+    def transactions(self):
+        """Snapshot list of pending transactions (a copy; use len() or by_id in hot paths)"""
+        return list(self.by_id.values())
+
+    def add_tx(self, tx):
+        """Add a transaction; returns False if it is already pending"""
+        tx_id = _key(tx)
+        if tx_id in self.by_id:
+            return False
+        self.by_id[tx_id] = tx
+        self.by_sender.setdefault(getattr(tx, 'sender', None), {})[tx_id] = tx
+        size = len(encode_transaction(tx))
+        self.sizes[tx_id] = size
+        self.total_bytes += size
+        self.added += 1
+        return True
+
+    # Older callers use the long name
+    add_transaction = add_tx
+
+    def add_transactions(self, txs):
+        """Add many transactions (e.g. re-inserting a disconnected block); returns how many were new"""
+        return sum(1 for tx in txs if self.add_tx(tx))
+
+    def remove(self, tx_id):
+        """Remove one transaction by id; returns it, or None if it was not pending"""
+        tx = self.by_id.pop(tx_id, None)
+        if tx is None:
+            return None
+        sender = getattr(tx, 'sender', None)
+        queue = self.by_sender[sender]
+        del queue[tx_id]
+        if not queue:
+            del self.by_sender[sender]
+        self.total_bytes -= self.sizes.pop(tx_id)
+        return tx
+
+    def remove_transactions(self, txs):
+        """Remove the transactions of a mined block; returns how many were pending"""
+        return sum(1 for tx in txs if self.remove(_key(tx)) is not None)
+
+    def get(self, tx_id):
+        return self.by_id.get(tx_id)
+
+    def sender_queue(self, sender):
+        """Pending transactions of one sender, oldest first"""
+        return list(self.by_sender.get(sender, {}).values())
+
+    def clear(self):
+        self.by_id.clear()
+        self.by_sender.clear()
+        self.sizes.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, tx_id):
+        return tx_id in self.by_id
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+# Test function
+def test_mempool():
+    print("\nTesting Mempool...")
+    import time
+    from core.transaction import Transaction
+
+    mempool = Mempool()
+    txs = [Transaction(f"sender_{i % 100}", f"receiver_{i}", i) for i in range(100000)]
+
+    start = time.time()
+    mempool.add_transactions(txs)
+    print(f"Added {len(mempool)} txs ({mempool.total_bytes:,} bytes) in {time.time() - start:.2f}s")
+    assert not mempool.add_tx(txs[0])  # duplicate
+
+    block = txs[:1000]
+    start = time.time()
+    removed = mempool.remove_transactions(block)
+    print(f"Removed {removed} mined txs in {(time.time() - start) * 1000:.1f} ms")
+    assert len(mempool) == 99000 and txs[0].tx_id not in mempool
+    assert len(mempool.sender_queue("sender_5")) == 990
+
+    # Reorg: the block's transactions come back
+    mempool.add_transactions(block)
+    assert len(mempool) == 100000
+    assert mempool.added == 101000  # re-added transactions count as arrivals
+
+    print("Test completed!")
 
-    def add_transaction(self, tx):
-        self.transactions.append(tx)
+if __name__ == "__main__":
+    test_mempool()
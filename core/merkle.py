@@ -0,0 +1,86 @@
+# core/merkle.py
+
+import hashlib
+import json
+
+EMPTY_ROOT = bytes(32)
+
+
+def tx_hash(tx):
+    """32-byte leaf hash of a transaction"""
+    tx_id = getattr(tx, 'tx_id', None)
+    if tx_id is None:
+        if isinstance(tx, dict):
+            tx_id = json.dumps(tx, sort_keys=True, default=str)
+        else:
+            tx_id = str(tx)
+    return hashlib.sha256(str(tx_id).encode()).digest()
+
+
+def _hash_pair(left, right):
+    return hashlib.sha256(left + right).digest()
+
+
+class MerkleTree:
+    """Binary Merkle tree over transaction hashes (odd nodes are paired with themselves)"""
+
+    def __init__(self, leaves):
+        self.levels = [list(leaves)]
+        level = self.levels[0]
+        while len(level) > 1:
+            if len(level) % 2:
+                level = level + [level[-1]]
+            level = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+            self.levels.append(level)
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        return cls([tx_hash(tx) for tx in transactions])
+
+    @property
+    def root(self):
+        top = self.levels[-1]
+        return top[0] if top else EMPTY_ROOT
+
+    def proof(self, index):
+        """Sibling hashes from leaf to root as (hash, sibling_is_right) pairs"""
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling >= len(level):
+                sibling = index
+            path.append((level[sibling], sibling >= index))
+            index //= 2
+        return path
+
+
+def merkle_root(transactions):
+    """Merkle root of a transaction list"""
+    return MerkleTree.from_transactions(transactions).root
+
+
+def verify_proof(leaf, proof, root):
+    """Check that leaf is included under root"""
+    node = leaf
+    for sibling, sibling_is_right in proof:
+        node = _hash_pair(node, sibling) if sibling_is_right else _hash_pair(sibling, node)
+    return node == root
+
+
+# Test function
+def test_merkle():
+    print("\nTesting MerkleTree...")
+    txs = [f"tx{i}" for i in range(7)]
+    tree = MerkleTree.from_transactions(txs)
+    print(f"Root: {tree.root.hex()}")
+
+    for i, tx in enumerate(txs):
+        assert verify_proof(tx_hash(tx), tree.proof(i), tree.root)
+    assert not verify_proof(tx_hash("forged"), tree.proof(0), tree.root)
+    assert merkle_root([]) == EMPTY_ROOT
+    print(f"Verified inclusion proofs for {len(txs)} transactions")
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_merkle()
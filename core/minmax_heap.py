@@ -0,0 +1,300 @@
+# core/minmax_heap.py
+
+import heapq
+
+
+def _is_min_level(i):
+    return (i + 1).bit_length() % 2 == 1
+
+
+class MinMaxHeap:
+    """
+    Double-ended priority queue
+
+    Even tree levels hold minima of their subtrees, odd levels maxima, so
+    both ends are visible in O(1) and push, pop_min, pop_max and removal
+    of any item are O(log n). Each item's position is kept in its
+    `heap_index` attribute, which is what makes removal by item cheap.
+    """
+
+    def __init__(self, items=(), key=None, keys=None):
+        self.key = key or (lambda item: item)
+        self.items = list(items)
+        # Callers that already hold the keys (e.g. computed in bulk) pass them in
+        self.keys = list(keys) if keys is not None else [self.key(item) for item in self.items]
+        for i, item in enumerate(self.items):
+            item.heap_index = i
+        self._heapify()
+
+    def _heapify(self):
+        """Floyd's bottom-up build, O(n); one tree level at a time"""
+        last = len(self.items) // 2 - 1
+        if last < 0:
+            return
+        level = (last + 1).bit_length() - 1
+        while level >= 0:
+            first = (1 << level) - 1
+            end = min(2 * first + 1, last + 1)
+            trickle = self._trickle_down_min if level % 2 == 0 else self._trickle_down_max
+            for i in reversed(range(first, end)):
+                trickle(i)
+            level -= 1
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    # Internal helpers ---------------------------------------------------
+
+    def _swap(self, i, j):
+        items, keys = self.items, self.keys
+        items[i], items[j] = items[j], items[i]
+        keys[i], keys[j] = keys[j], keys[i]
+        items[i].heap_index = i
+        items[j].heap_index = j
+
+    def _bubble_up(self, i):
+        if i == 0:
+            return
+        parent = (i - 1) // 2
+        keys = self.keys
+        if _is_min_level(i):
+            if keys[i] > keys[parent]:
+                self._swap(i, parent)
+                self._bubble_up_grand(parent, max_level=True)
+            else:
+                self._bubble_up_grand(i, max_level=False)
+        else:
+            if keys[i] < keys[parent]:
+                self._swap(i, parent)
+                self._bubble_up_grand(parent, max_level=False)
+            else:
+                self._bubble_up_grand(i, max_level=True)
+
+    def _bubble_up_grand(self, i, max_level):
+        keys = self.keys
+        while i > 2:
+            grand = ((i - 1) // 2 - 1) // 2
+            if (keys[i] > keys[grand]) if max_level else (keys[i] < keys[grand]):
+                self._swap(i, grand)
+                i = grand
+            else:
+                break
+
+    def _trickle_down(self, i):
+        """Move items[i] down until both heap orders hold below it"""
+        if _is_min_level(i):
+            self._trickle_down_min(i)
+        else:
+            self._trickle_down_max(i)
+
+    def _trickle_down_min(self, i):
+        keys = self.keys
+        n = len(keys)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                return
+            # Smallest among children and grandchildren
+            best = child
+            if child + 1 < n and keys[child + 1] < keys[best]:
+                best = child + 1
+            grand = 2 * child + 1
+            for g in range(grand, min(grand + 4, n)):
+                if keys[g] < keys[best]:
+                    best = g
+
+            if keys[best] >= keys[i]:
+                return
+            self._swap(best, i)
+            if best < grand:
+                return
+            parent = (best - 1) // 2
+            if keys[best] > keys[parent]:
+                self._swap(best, parent)
+            i = best
+
+    def _trickle_down_max(self, i):
+        keys = self.keys
+        n = len(keys)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                return
+            # Largest among children and grandchildren
+            best = child
+            if child + 1 < n and keys[child + 1] > keys[best]:
+                best = child + 1
+            grand = 2 * child + 1
+            for g in range(grand, min(grand + 4, n)):
+                if keys[g] > keys[best]:
+                    best = g
+
+            if keys[best] <= keys[i]:
+                return
+            self._swap(best, i)
+            if best < grand:
+                return
+            parent = (best - 1) // 2
+            if keys[best] < keys[parent]:
+                self._swap(best, parent)
+            i = best
+
+    def _max_index(self):
+        n = len(self.items)
+        if n <= 2:
+            return n - 1
+        return 1 if self.keys[1] >= self.keys[2] else 2
+
+    def _remove_at(self, i):
+        items, keys = self.items, self.keys
+        item = items[i]
+        last = items.pop()
+        last_key = keys.pop()
+        if i < len(items):
+            items[i] = last
+            keys[i] = last_key
+            last.heap_index = i
+            self._trickle_down(i)
+            self._bubble_up(last.heap_index)
+        item.heap_index = None
+        return item
+
+    # Public API ---------------------------------------------------------
+
+    def push(self, item):
+        item.heap_index = len(self.items)
+        self.items.append(item)
+        self.keys.append(self.key(item))
+        self._bubble_up(item.heap_index)
+
+    def peek_min(self):
+        return self.items[0] if self.items else None
+
+    def peek_max(self):
+        return self.items[self._max_index()] if self.items else None
+
+    def pop_min(self):
+        return self._remove_at(0) if self.items else None
+
+    def pop_max(self):
+        return self._remove_at(self._max_index()) if self.items else None
+
+    def remove(self, item):
+        """Remove an item that is in the heap"""
+        return self._remove_at(item.heap_index)
+
+    def largest(self, count, accept=None):
+        """
+        The `count` largest items, largest first, in O(count log count)
+
+        Max-level nodes bound their whole subtree, so a best-first walk only
+        expands those; min-level nodes are offered as plain candidates.
+        Items for which `accept` returns False are walked past but not
+        returned or counted.
+        """
+        items, keys = self.items, self.keys
+        n = len(items)
+        result = []
+        neg = _negate if n and _negatable(keys[0]) else _neg
+        # Entries: (negated key, index, expandable)
+        frontier = []
+        if n:
+            frontier.append((neg(keys[0]), 0, False))
+        for i in (1, 2):
+            if i < n:
+                heapq.heappush(frontier, (neg(keys[i]), i, True))
+
+        while frontier and len(result) < count:
+            _, i, expandable = heapq.heappop(frontier)
+            if accept is None or accept(items[i]):
+                result.append(items[i])
+            if not expandable:
+                continue
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n:
+                    heapq.heappush(frontier, (neg(keys[child]), child, False))
+                    for grand in (2 * child + 1, 2 * child + 2):
+                        if grand < n:
+                            heapq.heappush(frontier, (neg(keys[grand]), grand, True))
+        return result
+
+
+def _negatable(key):
+    if isinstance(key, tuple):
+        return all(isinstance(k, (int, float)) for k in key)
+    return isinstance(key, (int, float))
+
+
+def _negate(key):
+    if isinstance(key, tuple):
+        return tuple([-k for k in key])
+    return -key
+
+
+class _neg:
+    """Reverses the ordering of any key (slower fallback for non-numeric keys)"""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+# Test function
+def test_minmax_heap():
+    print("\nTesting MinMaxHeap...")
+    import random
+
+    class Item:
+        def __init__(self, value):
+            self.value = value
+            self.heap_index = None
+
+    rng = random.Random(7)
+    heap = MinMaxHeap(key=lambda item: item.value)
+    live = []
+    for step in range(20000):
+        op = rng.random()
+        if op < 0.5 or not live:
+            item = Item(rng.randint(0, 1000))
+            heap.push(item)
+            live.append(item)
+        elif op < 0.65:
+            item = heap.pop_min()
+            assert item.value == min(x.value for x in live)
+            live.remove(item)
+        elif op < 0.8:
+            item = heap.pop_max()
+            assert item.value == max(x.value for x in live)
+            live.remove(item)
+        elif op < 0.95:
+            item = rng.choice(live)
+            heap.remove(item)
+            live.remove(item)
+        else:
+            top = [x.value for x in heap.largest(5)]
+            assert top == sorted((x.value for x in live), reverse=True)[:5]
+    assert len(heap) == len(live)
+    even = [x.value for x in heap.largest(5, accept=lambda item: item.value % 2 == 0)]
+    assert even == sorted((x.value for x in live if x.value % 2 == 0), reverse=True)[:5]
+
+    built = MinMaxHeap([Item(v) for v in range(1000)], key=lambda item: item.value)
+    assert built.peek_min().value == 0 and built.peek_max().value == 999
+    values = [rng.randint(0, 10**6) for _ in range(5000)]
+    built = MinMaxHeap([Item(v) for v in values], key=lambda item: item.value)
+    assert [built.pop_min().value for _ in range(2500)] == sorted(values)[:2500]
+    assert [built.pop_max().value for _ in range(2500)] == sorted(values, reverse=True)[:2500]
+    print(f"Checked 20000 random operations ({len(heap)} items left)")
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_minmax_heap()
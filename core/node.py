@@ -1,13 +1,67 @@
+import threading
 import time
+from core.mining import MiningJob
 
 class Node:
-    def __init__(self, ip, port):
+    def __init__(self, ip, port, blockchain=None, mempool=None, retarget_threshold=10):
         self.ip = ip
         self.port = port
         self.running = False
+        self.blockchain = blockchain
+        self.mempool = mempool
+        self.retarget_threshold = retarget_threshold
+        self.mining_job = None
+        self._template_size = 0
+        self._wake = threading.Event()
 
     def start(self):
         self.running = True
         print(f"Node running on {self.ip}:{self.port}")
         while self.running:
-            time.sleep(1)
+            if self.blockchain is not None and self.mempool is not None:
+                self._update_mining()
+            self._wake.wait(1)
+            self._wake.clear()
+
+    def stop(self):
+        self.running = False
+        if self.mining_job:
+            self.mining_job.cancel()
+        self._wake.set()
+
+    def _update_mining(self):
+        """Start, retarget or restart the mining job for the current mempool"""
+        pending = len(self.mempool)
+        job = self.mining_job
+        if job is None or not job.running:
+            if pending:
+                self._template_size = pending
+                self.mining_job = MiningJob(
+                    self.blockchain, list(self.mempool.by_id.values()), on_block=self._on_block_mined
+                ).start()
+        elif abs(pending - self._template_size) >= self.retarget_threshold:
+            # The mempool moved a lot; don't keep hashing a stale template
+            self._template_size = pending
+            job.update_template(list(self.mempool.by_id.values()))
+
+    def _on_block_mined(self, block):
+        self.mempool.remove_transactions(block.transactions)
+        print(f"Node {self.ip}:{self.port} mined block {block.index}: {block.hash[:16]}...")
+        self._wake.set()
+
+    def receive_block(self, block):
+        """Accept a peer block; the running job moves to the new tip"""
+        if self.blockchain is None or not self.blockchain.add_block(block):
+            return False
+        self.mempool.remove_transactions(block.transactions)
+
+        # Stop hashing the stale template right away and continue on the new tip
+        job = self.mining_job
+        if job and job.running:
+            if len(self.mempool):
+                self._template_size = len(self.mempool)
+                job.update_template(list(self.mempool.by_id.values()))
+            else:
+                job.cancel()
+        self._wake.set()
+        return True
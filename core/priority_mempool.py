@@ -1,90 +1,237 @@
 # core/priority_mempool.py
 
-import heapq
+import itertools
 from datetime import datetime
+import numpy as np
+from core.minmax_heap import MinMaxHeap
+
+# Default weights of the AI score and the fee in a transaction's priority
+AI_WEIGHT = 0.7
+FEE_WEIGHT = 0.3
+
+_sequence = itertools.count()
 
 class PriorityTransaction:
-    def __init__(self, tx, ai_score=0.5, fee=0):
+    def __init__(self, tx, ai_score=0.5, fee=0, ai_weight=AI_WEIGHT, fee_weight=FEE_WEIGHT):
         self.tx = tx
         self.ai_score = ai_score
         self.fee = fee
         self.timestamp = datetime.now()
-        self.priority_score = self.calculate_priority()
+        self.priority_score = self.calculate_priority(ai_weight, fee_weight)
+        self.seq = next(_sequence)
+        self.heap_index = None
+        self.removed = False
     
-    def calculate_priority(self):
+    @property
+    def sort_key(self):
+        """Heap order: priority, then older first among equal priorities"""
+        return (self.priority_score, -self.seq)
+    
+    def calculate_priority(self, ai_weight=AI_WEIGHT, fee_weight=FEE_WEIGHT):
         """Calculate priority based on AI score and fee"""
-        return (self.ai_score * 0.7) + (self.fee * 0.3)
+        return (self.ai_score * ai_weight) + (self.fee * fee_weight)
     
     def __lt__(self, other):
         return self.priority_score > other.priority_score
 
+def _tx_id(tx):
+    return getattr(tx, 'tx_id', str(id(tx)))
+
+def _is_live(ptx):
+    return not ptx.removed
+
 class PriorityMempool:
-    def __init__(self, max_size=1000):
-        self.heap = []
+    """
+    Bounded transaction pool ordered by priority
+
+    A transaction that is already pending can be replaced by the same
+    transaction with a fee at least `min_fee_bump` (fraction) higher.
+    Removal by id only marks the entry as a tombstone; tombstones are
+    skipped by every read and dropped in one O(n) rebuild once they
+    outnumber `compact_ratio` of the live entries.
+
+    Priorities are `ai_weight * ai_score + fee_weight * fee`; rescore()
+    applies new AI scores or weights to the whole pool in one pass.
+    """
+    def __init__(self, max_size=1000, verbose=True, min_fee_bump=0.1, compact_ratio=0.5,
+                 ai_weight=AI_WEIGHT, fee_weight=FEE_WEIGHT):
+        # Min-max heap: lowest and highest priority are both O(log n) away
+        self.heap = MinMaxHeap(key=lambda ptx: ptx.sort_key)
         self.tx_map = {}
         self.max_size = max_size
-        print(f"[PRIORITY] Priority mempool created (max: {max_size})")
+        self.verbose = verbose
+        self.min_fee_bump = min_fee_bump
+        self.compact_ratio = compact_ratio
+        self.ai_weight = ai_weight
+        self.fee_weight = fee_weight
+        self.tombstones = 0
+        self.added = 0  # transactions ever admitted (replacements excluded)
+        self.watchers = []
+        self.log(f"[PRIORITY] Priority mempool created (max: {max_size})")
+    
+    def log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def watch(self, watcher):
+        """Register an object whose tx_added(ptx) / tx_removed(ptx) follow every change"""
+        self.watchers.append(watcher)
     
     def add_tx(self, tx, ai_score=0.5, fee=0):
-        """Add transaction with priority"""
-        if hasattr(tx, 'tx_id') and tx.tx_id in self.tx_map:
-            print(f"[PRIORITY] Transaction {tx.tx_id} already exists")
-            return False
+        """Add transaction with priority, or replace a pending one paying a higher fee"""
+        tx_id = _tx_id(tx)
+        existing = self.tx_map.get(tx_id)
+        if existing is not None:
+            if fee <= existing.fee or fee < existing.fee * (1 + self.min_fee_bump):
+                self.log(f"[PRIORITY] Transaction {tx_id} already exists")
+                return False
+            self._discard(existing)
+            self.log(f"[PRIORITY] Replacing TX {tx_id}: fee {existing.fee} -> {fee}")
         
-        # If mempool is full, remove lowest priority
-        if len(self.heap) >= self.max_size:
-            removed = self.remove_lowest_priority()
-            if removed:
-                print(f"[PRIORITY] Removed low priority TX: {removed.tx.tx_id}")
+        else:
+            self.added += 1
+            # If mempool is full, remove lowest priority
+            if len(self.tx_map) >= self.max_size:
+                removed = self.remove_lowest_priority()
+                if removed:
+                    self.log(f"[PRIORITY] Removed low priority TX: {_tx_id(removed.tx)}")
         
         # Create priority transaction
-        priority_tx = PriorityTransaction(tx, ai_score, fee)
-        heapq.heappush(self.heap, priority_tx)
+        priority_tx = PriorityTransaction(tx, ai_score, fee, self.ai_weight, self.fee_weight)
+        self.heap.push(priority_tx)
         
         # Store in map
-        tx_id = getattr(tx, 'tx_id', str(id(tx)))
         self.tx_map[tx_id] = priority_tx
+        for watcher in self.watchers:
+            watcher.tx_added(priority_tx)
         
-        print(f"[PRIORITY] Added TX {tx_id} with score {priority_tx.priority_score:.2f}")
+        self.log(f"[PRIORITY] Added TX {tx_id} with score {priority_tx.priority_score:.2f}")
+        self._maybe_compact()
         return True
     
+    def _discard(self, ptx):
+        """Tombstone an entry; it stays in the heap until popped or compacted"""
+        ptx.removed = True
+        self.tombstones += 1
+        for watcher in self.watchers:
+            watcher.tx_removed(ptx)
+    
+    def _pop(self, pop):
+        """Pop through tombstones until a live entry comes out"""
+        while True:
+            ptx = pop()
+            if ptx is None or not ptx.removed:
+                return ptx
+            self.tombstones -= 1
+    
     def remove_lowest_priority(self):
         """Remove lowest priority transaction"""
-        if not self.heap:
+        lowest = self._pop(self.heap.pop_min)
+        if lowest is not None:
+            self._forget(lowest)
+        return lowest
+    
+    def pop_highest_priority(self):
+        """Remove and return the highest priority transaction"""
+        highest = self._pop(self.heap.pop_max)
+        if highest is None:
+            return None
+        self._forget(highest)
+        return highest.tx
+    
+    def _forget(self, ptx):
+        """Drop a live entry that was already popped from the heap"""
+        del self.tx_map[_tx_id(ptx.tx)]
+        for watcher in self.watchers:
+            watcher.tx_removed(ptx)
+    
+    def remove_tx(self, tx_id):
+        """Remove a transaction by id; returns it, or None if it is not pending"""
+        ptx = self.tx_map.pop(tx_id, None)
+        if ptx is None:
             return None
+        self._discard(ptx)
+        self._maybe_compact()
+        return ptx.tx
+    
+    def remove_confirmed(self, transactions):
+        """Drop the transactions of a confirmed block; returns how many were pending"""
+        removed = 0
+        for tx in transactions:
+            ptx = self.tx_map.pop(tx if isinstance(tx, str) else _tx_id(tx), None)
+            if ptx is not None:
+                self._discard(ptx)
+                removed += 1
+        self._maybe_compact()
+        return removed
+    
+    def _maybe_compact(self):
+        if self.tombstones > 64 and self.tombstones > len(self.tx_map) * self.compact_ratio:
+            self.compact()
+    
+    def compact(self):
+        """Rebuild the heap from the live entries only (O(n))"""
+        self.heap = MinMaxHeap(self.tx_map.values(), key=self.heap.key)
+        self.tombstones = 0
+    
+    def rescore(self, scores=None, ai_weight=None, fee_weight=None):
+        """
+        Apply new AI scores ({tx_id: score}) and/or weights to the pool
+
+        All priorities are recomputed as one vector operation and the heap
+        is rebuilt with a single O(n) heapify, which also drops tombstones.
+        Returns how many of the given tx ids were pending.
+        """
+        if ai_weight is not None:
+            self.ai_weight = ai_weight
+        if fee_weight is not None:
+            self.fee_weight = fee_weight
         
-        # In a max-heap by priority, lowest is at the end
-        self.heap.sort(key=lambda x: x.priority_score)
-        lowest = self.heap.pop()
-        heapq.heapify(self.heap)
+        updated = 0
+        for tx_id, score in (scores or {}).items():
+            ptx = self.tx_map.get(tx_id)
+            if ptx is not None:
+                ptx.ai_score = score
+                updated += 1
         
-        tx_id = getattr(lowest.tx, 'tx_id', str(id(lowest.tx)))
-        del self.tx_map[tx_id]
+        pending = list(self.tx_map.values())
+        count = len(pending)
+        ai_scores = np.fromiter((ptx.ai_score for ptx in pending), dtype=np.float64, count=count)
+        fees = np.fromiter((ptx.fee for ptx in pending), dtype=np.float64, count=count)
+        seqs = np.fromiter((ptx.seq for ptx in pending), dtype=np.int64, count=count)
+        priorities = (ai_scores * self.ai_weight + fees * self.fee_weight).tolist()
+        for ptx, priority in zip(pending, priorities):
+            ptx.priority_score = priority
         
-        return lowest
+        # Heap keys are built column-wise too, matching PriorityTransaction.sort_key
+        keys = zip(priorities, (-seqs).tolist())
+        self.heap = MinMaxHeap(pending, key=self.heap.key, keys=keys)
+        self.tombstones = 0
+        self.log(f"[PRIORITY] Rescored {count} transactions ({updated} new AI scores)")
+        return updated
     
     def get_next_transactions(self, count=10):
         """Get next N highest priority transactions"""
-        if not self.heap:
-            return []
-        
-        # Sort by priority (highest first)
-        sorted_txs = sorted(self.heap, key=lambda x: x.priority_score, reverse=True)
-        result = [ptx.tx for ptx in sorted_txs[:count]]
+        result = [ptx.tx for ptx in self.heap.largest(count, accept=_is_live)]
         
-        print(f"[PRIORITY] Returning {len(result)} transactions")
+        self.log(f"[PRIORITY] Returning {len(result)} transactions")
         return result
     
+    def __len__(self):
+        return len(self.tx_map)
+    
+    def __contains__(self, tx_id):
+        return tx_id in self.tx_map
+    
     def print_status(self):
         """Print current mempool status"""
         print("\n=== PRIORITY MEMPOOL STATUS ===")
-        print(f"Transactions in mempool: {len(self.heap)}")
-        print(f"Available slots: {self.max_size - len(self.heap)}")
+        print(f"Transactions in mempool: {len(self)}")
+        print(f"Available slots: {self.max_size - len(self)}")
         
-        if self.heap:
+        if self.tx_map:
             print("\nTop 5 transactions by priority:")
-            sorted_txs = sorted(self.heap, key=lambda x: x.priority_score, reverse=True)
-            for i, ptx in enumerate(sorted_txs[:5], 1):
+            for i, ptx in enumerate(self.heap.largest(5, accept=_is_live), 1):
                 tx_id = getattr(ptx.tx, 'tx_id', 'N/A')
                 print(f"{i}. TX {tx_id[:8]}... - Score: {ptx.priority_score:.2f}")
 
@@ -123,6 +270,26 @@ def test_priority_mempool():
     top_txs = mempool.get_next_transactions(3)
     print(f"\nGot {len(top_txs)} top transactions")
     
+    # Replace-by-fee needs a large enough bump
+    assert not mempool.add_tx(MockTransaction("tx001"), 0.8, 2.1)
+    assert mempool.add_tx(MockTransaction("tx001"), 0.8, 4.0)
+    assert len(mempool) == 5 and mempool.tombstones == 1
+    assert mempool.get_next_transactions(1)[0].tx_id == "tx001"
+    
+    # Removal by id and of a confirmed block leave tombstones behind
+    assert mempool.remove_tx("tx003").tx_id == "tx003"
+    assert mempool.remove_confirmed([MockTransaction("tx001"), "tx002", "unknown"]) == 2
+    assert len(mempool) == 2 and "tx001" not in mempool
+    assert [tx.tx_id for tx in mempool.get_next_transactions(5)] == ["tx006", "tx004"]
+    mempool.compact()
+    assert len(mempool.heap) == 2 and mempool.tombstones == 0
+    
+    # New AI scores re-rank the pool in one pass
+    assert mempool.rescore({"tx004": 1.0, "unknown": 1.0}) == 1
+    assert [tx.tx_id for tx in mempool.get_next_transactions(5)] == ["tx006", "tx004"]
+    mempool.rescore(ai_weight=1.0, fee_weight=0.0)
+    assert [tx.tx_id for tx in mempool.get_next_transactions(5)] == ["tx004", "tx006"]
+    
     print("\nTest completed!")
 
 if __name__ == "__main__":
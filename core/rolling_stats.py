@@ -0,0 +1,156 @@
+# core/rolling_stats.py
+
+import math
+import time
+
+import numpy as np
+
+
+class RollingStats:
+    """
+    Running statistics over the most recent samples, in fixed memory
+
+    Samples go into one ring buffer sized for the largest window. Every
+    window keeps a running sum (and, when `value_range` is given, a
+    histogram of the integer values in it), updated as a sample enters and
+    the one `window` places back leaves, so push(), mean() and the EWMA
+    are O(1) and percentiles over a bounded integer range are O(range).
+    Without `value_range`, percentiles partition the window, O(window).
+    """
+
+    def __init__(self, windows=(100, 1000), alpha=0.1, value_range=None):
+        self.windows = tuple(sorted(set(windows)))
+        self.capacity = self.windows[-1]
+        self.alpha = alpha
+        self.values = np.zeros(self.capacity, dtype=np.float64)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.head = 0           # next slot to write
+        self.count = 0          # samples ever pushed
+        self.sums = [0.0] * len(self.windows)
+        self.ewma = None
+
+        self.value_range = value_range
+        if value_range is not None:
+            low, high = value_range
+            self.histograms = np.zeros((len(self.windows), high - low + 1), dtype=np.int64)
+
+    def _window(self, window):
+        if window is None:
+            return len(self.windows) - 1
+        return self.windows.index(window)
+
+    def push(self, value, timestamp=None):
+        slot = self.head
+        for i, window in enumerate(self.windows):
+            if self.count >= window:
+                leaving = self.values[(slot - window) % self.capacity]
+                self.sums[i] -= leaving
+                if self.value_range is not None:
+                    self.histograms[i, int(leaving) - self.value_range[0]] -= 1
+            self.sums[i] += value
+            if self.value_range is not None:
+                self.histograms[i, int(value) - self.value_range[0]] += 1
+
+        self.values[slot] = value
+        self.timestamps[slot] = time.time() if timestamp is None else timestamp
+        self.head = (slot + 1) % self.capacity
+        self.count += 1
+        self.ewma = value if self.ewma is None else self.ewma + self.alpha * (value - self.ewma)
+
+        # Re-add the sums once per lap so float rounding cannot accumulate
+        if self.head == 0:
+            for i, window in enumerate(self.windows):
+                self.sums[i] = float(self._recent(window).sum())
+
+    def _recent(self, window):
+        """Values of the last `window` samples (a copy only when they wrap)"""
+        n = min(window, self.count)
+        start = (self.head - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.values[start:start + n]
+        return np.concatenate((self.values[start:], self.values[:self.head]))
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def current(self):
+        return self.values[(self.head - 1) % self.capacity] if self.count else None
+
+    def mean(self, window=None):
+        i = self._window(window)
+        n = min(self.windows[i], self.count)
+        return self.sums[i] / n if n else None
+
+    def percentile(self, q, window=None):
+        """Nearest-rank percentile (q in 0..100) of the last `window` samples"""
+        i = self._window(window)
+        n = min(self.windows[i], self.count)
+        if not n:
+            return None
+        rank = max(1, math.ceil(q / 100 * n))
+        if self.value_range is not None:
+            position = int(np.searchsorted(np.cumsum(self.histograms[i]), rank))
+            return self.value_range[0] + position
+        return float(np.partition(self._recent(self.windows[i]), rank - 1)[rank - 1])
+
+    def last(self, n):
+        """The last n (timestamp, value) pairs, oldest first"""
+        n = min(n, len(self))
+        slots = [(self.head - n + k) % self.capacity for k in range(n)]
+        return [(float(self.timestamps[s]), float(self.values[s])) for s in slots]
+
+    def summary(self):
+        return {
+            window: {
+                'mean': self.mean(window),
+                'p50': self.percentile(50, window),
+                'p95': self.percentile(95, window)
+            }
+            for window in self.windows
+        }
+
+
+# Test function
+def test_rolling_stats():
+    print("\nTesting RollingStats...")
+    import random
+
+    rng = random.Random(5)
+    stats = RollingStats(windows=(10, 100), alpha=0.2, value_range=(1, 10))
+    plain = RollingStats(windows=(10, 100))
+    samples = []
+    ewma = None
+    for _ in range(1000):
+        value = rng.randint(1, 10)
+        stats.push(value)
+        plain.push(value)
+        samples.append(value)
+        ewma = value if ewma is None else ewma + 0.2 * (value - ewma)
+        for window in (10, 100):
+            recent = sorted(samples[-window:])
+            assert abs(stats.mean(window) - sum(recent) / len(recent)) < 1e-9
+            for q in (50, 95):
+                expected = recent[max(1, math.ceil(q / 100 * len(recent))) - 1]
+                assert stats.percentile(q, window) == expected == plain.percentile(q, window)
+    assert abs(stats.ewma - ewma) < 1e-9
+    assert [value for _, value in stats.last(5)] == samples[-5:]
+    print(f"Summary: {stats.summary()}")
+
+    # Memory and cost per push do not grow with the number of samples
+    big = RollingStats(windows=(1440, 10080), value_range=(1, 10))
+    footprint = big.values.nbytes + big.timestamps.nbytes + big.histograms.nbytes
+    timings = []
+    for lap in range(3):
+        began = time.perf_counter()
+        for i in range(20000):
+            big.push(i % 10 + 1)
+        timings.append((time.perf_counter() - began) / 20000 * 1e6)
+    assert big.values.nbytes + big.timestamps.nbytes + big.histograms.nbytes == footprint
+    print(f"{big.count} samples in {footprint} bytes, push cost per lap: "
+          + ", ".join(f"{t:.1f} us" for t in timings))
+
+    print("Test completed!")
+
+if __name__ == "__main__":
+    test_rolling_stats()
@@ -6,76 +6,537 @@ import gzip
 import os
 from datetime import datetime
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from core.snapshot_archive import SnapshotArchive, SnapshotView, write_archive
+from core.snapshot_container import CHUNK_SIZE, CODECS, ChunkedReader, ChunkedWriter
+from core.snapshot_manifest import SnapshotManifest
+
+BLOCK_KEYS = ("blocks", "chain")
+EXTENSIONS = ('.pkl', '.pkl.gz', '.snap', '.blocks')
+
+class _HashingWriter:
+    """File wrapper that hashes and counts the bytes written through it"""
+    def __init__(self, f=None):
+        self.f = f
+        self.hash = hashlib.sha256()
+        self.size = 0
+    
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        if self.f is not None:
+            self.f.write(data)
+        return len(data)
+    
+    def flush(self):
+        if self.f is not None:
+            self.f.flush()
+
+class _HashingReader:
+    """File wrapper that hashes the bytes read through it"""
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+    
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.hash.update(data)
+        return data
+    
+    def readline(self, size=-1):
+        data = self.f.readline(size)
+        self.hash.update(data)
+        return data
+    
+    def drain(self):
+        """Hash whatever the consumer left unread"""
+        while self.read(CHUNK_SIZE):
+            pass
+        return self.hash.hexdigest()
+
+def _split_chain(blockchain_data):
+    """
+    (blocks, state, key) view of snapshot data
+
+    A list is taken as the blocks themselves; a dict holding a list under
+    "blocks" or "chain" as those blocks plus the remaining keys as state.
+    Anything else cannot be diffed: (None, None, None).
+    """
+    if isinstance(blockchain_data, list):
+        return blockchain_data, None, None
+    if isinstance(blockchain_data, dict):
+        for key in BLOCK_KEYS:
+            if isinstance(blockchain_data.get(key), list):
+                state = {k: v for k, v in blockchain_data.items() if k != key}
+                return blockchain_data[key], state, key
+    return None, None, None
+
+def _fingerprint(value):
+    """sha256 of the pickled value, streamed so no copy of the pickle is built"""
+    writer = _HashingWriter()
+    pickle.dump(value, writer, protocol=pickle.HIGHEST_PROTOCOL)
+    return writer.hash.hexdigest()
+
+def _detach(snapshot):
+    """
+    (header, blocks) with the block list cut out of the snapshot
+
+    Blocks are pickled as separate records after the header, so the
+    pickler's memo (which holds every object it has seen) only ever spans
+    one block instead of the whole chain.
+    """
+    if snapshot.get("kind") == "delta":
+        delta = snapshot["delta"]
+        header = dict(snapshot, delta=dict(delta, blocks=None))
+        blocks = delta["blocks"]
+    else:
+        data = snapshot["blockchain_data"]
+        blocks, _, key = _split_chain(data)
+        if blocks is None:
+            return snapshot, []
+        header = dict(snapshot, blockchain_data=None if key is None else dict(data, **{key: None}))
+        header["state_key"] = key
+    header["records"] = len(blocks)
+    return header, blocks
+
+def _attach(header, blocks):
+    """Inverse of _detach"""
+    snapshot = dict(header)
+    del snapshot["records"]
+    if snapshot.get("kind") == "delta":
+        snapshot["delta"] = dict(snapshot["delta"], blocks=blocks)
+    else:
+        key = snapshot.pop("state_key")
+        if key is None:
+            snapshot["blockchain_data"] = blocks
+        else:
+            snapshot["blockchain_data"][key] = blocks
+    return snapshot
+
+def _dump(snapshot, f):
+    header, blocks = _detach(snapshot)
+    pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+    for block in blocks:
+        pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _load(f):
+    header = pickle.load(f)
+    if "records" not in header:
+        return header  # single pickle, written by older versions
+    return _attach(header, [pickle.load(f) for _ in range(header["records"])])
+
+def file_checksum(filename):
+    """sha256 of a file's bytes, read in CHUNK_SIZE pieces"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 class BlockchainSnapshot:
-    def __init__(self, snapshot_dir="snapshots"):
+    def __init__(self, snapshot_dir="snapshots", full_every=24, codec="zlib", level=None,
+                 workers=None, chunk_size=CHUNK_SIZE, random_access=False):
+        """
+        Args:
+            snapshot_dir: Directory holding the snapshot files
+            full_every: Write a full snapshot after this many consecutive
+                deltas, which bounds how many files a restore reads
+            codec: Default codec of compressed snapshots ("zlib", "lzma",
+                or "gzip" for the old single-stream .pkl.gz)
+            level: Compression level (None for the codec's default)
+            workers: Compression threads (default: one per CPU)
+            chunk_size: Uncompressed bytes per independently compressed chunk
+            random_access: Write snapshots as .blocks archives (one record
+                per block plus an offset table) that open_snapshot() can
+                read block by block
+        """
         self.snapshot_dir = snapshot_dir
+        self.full_every = full_every
+        self.codec = codec
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.random_access = random_access
         os.makedirs(snapshot_dir, exist_ok=True)
+        self.manifest = SnapshotManifest(snapshot_dir, rebuild=self.rebuild_manifest)
+        if not self.manifest.exists:
+            self.rebuild_manifest()
         print(f"[SNAPSHOT] Snapshot directory: {snapshot_dir}")
     
-    def create_snapshot(self, blockchain_data, metadata=None, compress=True):
+    def _new_id(self):
+        """
+        Timestamp id, suffixed when several snapshots land in the same second
+
+        The id is reserved by creating its (empty) metadata file with
+        O_EXCL, so managers in other processes never pick the same one.
+        """
+        snapshot_id = f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        candidate, n = snapshot_id, 0
+        while True:
+            if not self._find_file(candidate):
+                try:
+                    os.close(os.open(self._metadata_file(candidate), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    return candidate
+                except FileExistsError:
+                    pass
+            n += 1
+            candidate = f"{snapshot_id}_{n}"
+    
+    def _manifest_entry(self, info, filename):
+        """Manifest entry for a snapshot file and its metadata"""
+        stats = os.stat(filename)
+        codec = info.get("codec", "gzip" if filename.endswith('.gz') else None)
+        return {
+            "id": info["id"],
+            "file": os.path.basename(filename),
+            "timestamp": info.get("timestamp"),
+            "modified": datetime.fromtimestamp(stats.st_mtime).isoformat(),
+            "kind": info.get("kind", "full"),
+            "parent": info.get("parent"),
+            "block_count": info.get("block_count"),
+            "height_range": info.get("height_range"),
+            "size_bytes": stats.st_size,
+            "checksum": info.get("checksum"),
+            "codec": codec,
+            "compressed": codec is not None,
+            "random_access": filename.endswith('.blocks')
+        }
+    
+    def rebuild_manifest(self):
+        """
+        Recreate the manifest from the snapshot files in the directory
+        
+        Runs once for directories written before the manifest existed, and
+        can be called to recover after files were added or removed by hand
+        (or when the manifest cannot be read).
+        """
+        with self.manifest.locked():
+            entries = []
+            for filename in os.listdir(self.snapshot_dir):
+                if filename.endswith(EXTENSIONS):
+                    snapshot_id = filename.split('.')[0]
+                    info = self._read_metadata(snapshot_id) or {}
+                    info["id"] = snapshot_id
+                    entries.append(self._manifest_entry(info, os.path.join(self.snapshot_dir, filename)))
+            
+            # Oldest first by creation time; copies keep their creation time
+            # but not their mtime. Ids break ties and cover missing metadata.
+            entries.sort(key=lambda x: (x["timestamp"] or "", x["id"]))
+            self.manifest.reset(entries)
+        return len(entries)
+    
+    def latest_snapshot(self):
+        """Manifest entry of the newest snapshot, or None"""
+        entry = self.manifest.latest()
+        return self._listing(entry) if entry else None
+    
+    def _listing(self, entry):
+        return dict(entry, filename=os.path.join(self.snapshot_dir, entry["file"]))
+    
+    def _metadata_file(self, snapshot_id):
+        return os.path.join(self.snapshot_dir, f"{snapshot_id}_metadata.json")
+    
+    def _read_metadata(self, snapshot_id):
+        try:
+            with open(self._metadata_file(snapshot_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def _diff(self, parent, blocks, state, key):
+        """
+        Delta from the parent's metadata, or None when a full snapshot is needed
+
+        The chain must extend the parent's: same shape, at least as many
+        blocks and the same block at the parent's tip. State values are
+        compared by fingerprint, so only changed keys are stored.
+        """
+        if parent is None or "block_count" not in parent or blocks is None:
+            return None
+        if parent.get("depth", 0) + 1 >= self.full_every or parent.get("state_key") != key:
+            return None
+        count = parent["block_count"]
+        if len(blocks) < count or (count and _fingerprint(blocks[count - 1]) != parent["tip_hash"]):
+            return None
+        
+        delta = {"blocks_from": count, "blocks": blocks[count:], "state_set": {}, "state_removed": []}
+        if state is not None:
+            previous = parent.get("state_hashes", {})
+            for name, value in state.items():
+                if previous.get(name) != _fingerprint(value):
+                    delta["state_set"][name] = value
+            delta["state_removed"] = [name for name in previous if name not in state]
+        return delta
+    
+    def create_snapshot(self, blockchain_data, metadata=None, compress=True, delta=None,
+                        random_access=None):
         """
         Create a snapshot of blockchain data
         
         Args:
             blockchain_data: The blockchain data (list of blocks, state, etc.)
             metadata: Additional metadata about the snapshot
-            compress: Whether to compress the snapshot
+            compress: Whether to compress the snapshot; True uses the
+                default codec, a codec name picks another one
+            delta: None writes a delta against the latest snapshot when the
+                chain extends it and the full_every policy allows; False
+                forces a full snapshot; True asks for a delta (falls back to
+                full if the chain does not extend the latest snapshot)
+            random_access: Override the manager's random_access setting
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        snapshot_id = f"snapshot_{timestamp}"
+        if random_access is None:
+            random_access = self.random_access
+        snapshot_id = self._new_id()
+        blocks, state, key = _split_chain(blockchain_data)
+        
+        parent = None
+        if delta is not False:
+            latest = self.manifest.latest()
+            if latest:
+                parent = self._read_metadata(latest["id"])
+        changes = self._diff(parent, blocks, state, key) if delta is not False else None
+        if delta and changes is None:
+            print("[SNAPSHOT] Chain does not extend the latest snapshot, writing a full one")
         
         # Prepare snapshot data
         snapshot = {
             "id": snapshot_id,
             "timestamp": datetime.now().isoformat(),
-            "blockchain_data": blockchain_data,
+            "kind": "full" if changes is None else "delta",
+            "parent": None if changes is None else parent["id"],
+            "blockchain_data": blockchain_data if changes is None else None,
+            "delta": changes,
             "metadata": metadata or {},
             "checksum": None
         }
         
-        # Calculate checksum
-        data_str = str(blockchain_data).encode('utf-8')
-        snapshot["checksum"] = hashlib.sha256(data_str).hexdigest()
-        
-        # Determine filename and save method
-        if compress:
+        # Determine filename and save method; the checksum covers the file
+        # bytes and is hashed while they are written
+        codec = (self.codec if compress is True else compress) if compress else None
+        if random_access:
+            # Records are compressed one by one; gzip framing adds nothing there
+            codec = "zlib" if codec == "gzip" else codec
+            filename = os.path.join(self.snapshot_dir, f"{snapshot_id}.blocks")
+            snapshot["checksum"], data_size = self._save_archive(snapshot, filename, codec)
+        elif codec == "gzip":
             filename = os.path.join(self.snapshot_dir, f"{snapshot_id}.pkl.gz")
-            self._save_compressed(snapshot, filename)
+            snapshot["checksum"], data_size = self._save_compressed(snapshot, filename)
+        elif codec:
+            filename = os.path.join(self.snapshot_dir, f"{snapshot_id}.snap")
+            snapshot["checksum"], data_size = self._save_chunked(snapshot, filename, codec)
         else:
             filename = os.path.join(self.snapshot_dir, f"{snapshot_id}.pkl")
-            self._save_uncompressed(snapshot, filename)
-        
-        # Also save metadata as JSON for quick inspection
-        metadata_file = os.path.join(self.snapshot_dir, f"{snapshot_id}_metadata.json")
-        with open(metadata_file, 'w') as f:
-            json.dump({
-                "id": snapshot_id,
-                "timestamp": snapshot["timestamp"],
-                "checksum": snapshot["checksum"],
-                "data_size": len(str(blockchain_data)),
-                "metadata": snapshot["metadata"]
-            }, f, indent=2)
-        
-        print(f"[SNAPSHOT] Created snapshot: {filename}")
+            snapshot["checksum"], data_size = self._save_uncompressed(snapshot, filename)
+        
+        # Also save metadata as JSON for quick inspection; the fingerprints
+        # let the next snapshot diff against this one without loading it
+        info = {
+            "id": snapshot_id,
+            "timestamp": snapshot["timestamp"],
+            "checksum": snapshot["checksum"],
+            "checksum_scope": "file",
+            "data_size": data_size,
+            "codec": codec,
+            "random_access": bool(random_access),
+            "kind": snapshot["kind"],
+            "parent": snapshot["parent"],
+            "depth": 0 if changes is None else parent.get("depth", 0) + 1,
+            "metadata": snapshot["metadata"]
+        }
+        if blocks is not None:
+            info["block_count"] = len(blocks)
+            first = 0 if changes is None else changes["blocks_from"]
+            info["height_range"] = [first, len(blocks) - 1] if len(blocks) > first else None
+            info["tip_hash"] = _fingerprint(blocks[-1]) if blocks else None
+            info["state_key"] = key
+            if state is not None:
+                info["state_hashes"] = {name: _fingerprint(value) for name, value in state.items()}
+        with open(self._metadata_file(snapshot_id), 'w') as f:
+            json.dump(info, f, indent=2)
+        self.manifest.add(self._manifest_entry(info, filename))
+        
+        print(f"[SNAPSHOT] Created {snapshot['kind']} snapshot: {filename}")
         print(f"[SNAPSHOT] Checksum: {snapshot['checksum']}")
         
         return snapshot
     
     def _save_compressed(self, data, filename):
-        """Save data with compression"""
-        with gzip.open(filename, 'wb') as f:
-            pickle.dump(data, f)
+        """Save data with compression; returns (file sha256, pickled size)"""
+        with open(filename, 'wb') as raw:
+            writer = _HashingWriter(raw)
+            with gzip.GzipFile(fileobj=writer, mode='wb') as f:
+                _dump(data, f)
+                data_size = f.tell()
+        return writer.hash.hexdigest(), data_size
+    
+    def _save_chunked(self, data, filename, codec):
+        """Save data as chunks compressed in parallel; returns (file sha256, pickled size)"""
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}")
+        with open(filename, 'wb') as raw, ThreadPoolExecutor(self.workers) as pool:
+            writer = ChunkedWriter(raw, pool, codec, self.level, self.chunk_size, 2 * self.workers)
+            _dump(data, writer)
+            writer.close()
+        return writer.hash.hexdigest(), writer.size
+    
+    def _save_archive(self, data, filename, codec):
+        """Save data as a random-access archive; returns (file sha256, file size)"""
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}")
+        header, blocks = _detach(data)
+        with open(filename, 'wb') as raw:
+            writer = _HashingWriter(raw)
+            size = write_archive(writer, header, blocks, codec, self.level)
+        return writer.hash.hexdigest(), size
     
     def _save_uncompressed(self, data, filename):
-        """Save data without compression"""
-        with open(filename, 'wb') as f:
-            pickle.dump(data, f)
+        """Save data without compression; returns (file sha256, pickled size)"""
+        with open(filename, 'wb') as raw:
+            writer = _HashingWriter(raw)
+            _dump(data, writer)
+        return writer.hash.hexdigest(), writer.size
+    
+    def _find_file(self, snapshot_id):
+        entry = self.manifest.get(snapshot_id)
+        if entry is not None:
+            filename = os.path.join(self.snapshot_dir, entry["file"])
+            if os.path.exists(filename):
+                return filename
+        for ext in EXTENSIONS:
+            filename = os.path.join(self.snapshot_dir, f"{snapshot_id}{ext}")
+            if os.path.exists(filename):
+                return filename
+        return None
+    
+    def _read_file(self, filename):
+        """
+        Unpickle a snapshot file, checking its checksum on the way
+
+        The file bytes are hashed as the unpickler consumes them, so the
+        check costs no second pass. Snapshots written before checksums
+        covered the file fall back to the old in-memory check.
+        """
+        info = self._read_metadata(os.path.basename(filename).split('.')[0]) or {}
+        if filename.endswith('.blocks'):
+            with SnapshotArchive(filename) as archive:
+                header = archive.header
+                snapshot = _attach(header, list(archive)) if "records" in header else header
+            digest = file_checksum(filename)
+        else:
+            with open(filename, 'rb') as raw:
+                if filename.endswith('.snap'):
+                    with ThreadPoolExecutor(self.workers) as pool:
+                        reader = ChunkedReader(raw, pool, 2 * self.workers)
+                        snapshot = _load(reader)
+                        digest = reader.digest()
+                else:
+                    snapshot, digest = self._read_stream(raw, filename.endswith('.gz'))
+        
+        if info.get("checksum_scope") == "file":
+            snapshot["checksum"] = info["checksum"]
+            valid = digest == info["checksum"]
+        else:
+            valid = self._verify_checksum(snapshot)
+        if not valid:
+            print(f"[SNAPSHOT] WARNING: Checksum verification failed for {snapshot.get('id')}!")
+        return snapshot
+    
+    def _read_stream(self, raw, compressed):
+        """(snapshot, file sha256) of a .pkl or .pkl.gz file"""
+        reader = _HashingReader(raw)
+        if compressed:
+            with gzip.GzipFile(fileobj=reader, mode='rb') as f:
+                snapshot = _load(f)
+        else:
+            snapshot = _load(reader)
+        return snapshot, reader.drain()
+    
+    def verify_snapshot(self, snapshot_id):
+        """Re-hash a snapshot file against its recorded checksum, without unpickling it"""
+        filename = self._find_file(snapshot_id)
+        info = self._read_metadata(snapshot_id)
+        if filename is None or info is None or info.get("checksum_scope") != "file":
+            return False
+        return file_checksum(filename) == info["checksum"]
+    
+    def open_snapshot(self, snapshot_id=None):
+        """
+        Lazy view of a snapshot's blocks (the latest snapshot by default)
+        
+        Returns a SnapshotView supporting len(), view[n], slicing and
+        iteration, with the rebuilt state in view.state. Archives written
+        with random_access are memory-mapped and only the blocks asked for
+        are decoded; other formats along the delta chain are loaded whole.
+        Close the view when done.
+        """
+        if snapshot_id is None:
+            latest = self.manifest.latest()
+            if latest is None:
+                print("[SNAPSHOT] No snapshots available")
+                return None
+            snapshot_id = latest["id"]
+        
+        links = []
+        try:
+            while True:
+                filename = self._find_file(snapshot_id)
+                if filename is None:
+                    raise FileNotFoundError(f"snapshot {snapshot_id} is missing")
+                if filename.endswith('.blocks'):
+                    archive = SnapshotArchive(filename)
+                    links.append((archive.header, archive))
+                else:
+                    links.append(_detach(self._read_file(filename)))
+                if links[-1][0].get("kind") != "delta":
+                    return SnapshotView(links)
+                snapshot_id = links[-1][0]["parent"]
+        except BaseException:
+            # Unmap the archives opened so far along the chain
+            for _, blocks in links:
+                if isinstance(blocks, SnapshotArchive):
+                    blocks.close()
+            raise
+    
+    def _rebuild(self, snapshot):
+        """
+        Full blockchain data of a delta snapshot
+
+        Walks the parent references back to the full snapshot, then replays
+        the deltas oldest first onto one copy of its blocks and state.
+        """
+        chain = [snapshot]
+        while chain[-1].get("kind") == "delta":
+            filename = self._find_file(chain[-1]["parent"])
+            if filename is None:
+                raise FileNotFoundError(f"parent snapshot {chain[-1]['parent']} is missing")
+            chain.append(self._read_file(filename))
+        
+        base = chain[-1]["blockchain_data"]
+        blocks, state, key = _split_chain(base)
+        blocks = list(blocks)
+        state = dict(state) if state is not None else None
+        for link in reversed(chain[:-1]):
+            delta = link["delta"]
+            del blocks[delta["blocks_from"]:]
+            blocks.extend(delta["blocks"])
+            if state is not None:
+                for name in delta["state_removed"]:
+                    state.pop(name, None)
+                state.update(delta["state_set"])
+        
+        if key is None:
+            return blocks
+        state[key] = blocks
+        return state
     
     def load_snapshot(self, snapshot_id=None, filename=None):
         """
         Load a snapshot from file
         
+        Delta snapshots come back with blockchain_data rebuilt from their
+        base snapshot and every delta in between.
+        
         Args:
             snapshot_id: ID of the snapshot (e.g., "snapshot_20241230_120000")
             filename: Direct filename to load
@@ -83,90 +544,58 @@ class BlockchainSnapshot:
         if filename is None:
             if snapshot_id is None:
                 # Load the latest snapshot
-                snapshots = self.list_snapshots()
-                if not snapshots:
+                latest = self.latest_snapshot()
+                if latest is None:
                     print("[SNAPSHOT] No snapshots available")
                     return None
-                filename = snapshots[-1]["filename"]
+                filename = latest["filename"]
             else:
                 # Try to find the snapshot file
-                possible_files = [
-                    os.path.join(self.snapshot_dir, f"{snapshot_id}.pkl"),
-                    os.path.join(self.snapshot_dir, f"{snapshot_id}.pkl.gz")
-                ]
-                
-                for file in possible_files:
-                    if os.path.exists(file):
-                        filename = file
-                        break
-                else:
+                filename = self._find_file(snapshot_id)
+                if filename is None:
                     print(f"[SNAPSHOT] Snapshot {snapshot_id} not found")
                     return None
         
         # Load the snapshot
         try:
-            if filename.endswith('.gz'):
-                with gzip.open(filename, 'rb') as f:
-                    snapshot = pickle.load(f)
-            else:
-                with open(filename, 'rb') as f:
-                    snapshot = pickle.load(f)
+            snapshot = self._read_file(filename)
             
-            # Verify checksum
-            if self._verify_checksum(snapshot):
-                print(f"[SNAPSHOT] Loaded snapshot: {snapshot['id']}")
-                print(f"[SNAPSHOT] Timestamp: {snapshot['timestamp']}")
-                return snapshot
-            else:
-                print("[SNAPSHOT] WARNING: Checksum verification failed!")
-                return snapshot
+            if snapshot.get("kind") == "delta":
+                snapshot["blockchain_data"] = self._rebuild(snapshot)
+            
+            print(f"[SNAPSHOT] Loaded snapshot: {snapshot['id']}")
+            print(f"[SNAPSHOT] Timestamp: {snapshot['timestamp']}")
+            return snapshot
                 
         except Exception as e:
             print(f"[SNAPSHOT] Error loading snapshot: {e}")
             return None
     
     def _verify_checksum(self, snapshot):
-        """Verify the checksum of loaded snapshot"""
-        if "checksum" not in snapshot:
+        """Verify the in-memory checksum of a snapshot written by older versions"""
+        if snapshot.get("checksum") is None:
             return True  # No checksum to verify
         
-        data_str = str(snapshot["blockchain_data"]).encode('utf-8')
+        payload = snapshot["delta"] if snapshot.get("kind") == "delta" else snapshot["blockchain_data"]
+        data_str = str(payload).encode('utf-8')
         calculated_checksum = hashlib.sha256(data_str).hexdigest()
         
         return snapshot["checksum"] == calculated_checksum
     
     def list_snapshots(self):
-        """List all available snapshots"""
-        snapshots = []
-        
-        for filename in os.listdir(self.snapshot_dir):
-            if filename.endswith(('.pkl', '.pkl.gz')):
-                filepath = os.path.join(self.snapshot_dir, filename)
-                stats = os.stat(filepath)
-                
-                snapshot_id = filename.split('.')[0]
-                if snapshot_id.endswith('_metadata'):
-                    continue
-                
-                snapshots.append({
-                    "id": snapshot_id,
-                    "filename": filepath,
-                    "size_bytes": stats.st_size,
-                    "modified": datetime.fromtimestamp(stats.st_mtime).isoformat(),
-                    "compressed": filename.endswith('.gz')
-                })
-        
-        # Sort by modification time (oldest first)
-        snapshots.sort(key=lambda x: x["modified"])
-        
-        return snapshots
+        """List all available snapshots (oldest first), from the manifest"""
+        return [self._listing(entry) for entry in self.manifest]
     
     def delete_snapshot(self, snapshot_id):
         """Delete a snapshot and its metadata"""
         deleted = 0
         
+        # Unlist it first: a failure below leaves stray files, which
+        # rebuild_manifest() picks up, never an entry without a file
+        entry = self.manifest.remove(snapshot_id)
+        
         # Delete main snapshot file (compressed and uncompressed)
-        for ext in ['.pkl', '.pkl.gz']:
+        for ext in EXTENSIONS:
             filename = os.path.join(self.snapshot_dir, f"{snapshot_id}{ext}")
             if os.path.exists(filename):
                 os.remove(filename)
@@ -174,11 +603,15 @@ class BlockchainSnapshot:
                 print(f"[SNAPSHOT] Deleted: {filename}")
         
         # Delete metadata file
-        metadata_file = os.path.join(self.snapshot_dir, f"{snapshot_id}_metadata.json")
+        metadata_file = self._metadata_file(snapshot_id)
         if os.path.exists(metadata_file):
             os.remove(metadata_file)
             deleted += 1
         
+        if entry is not None and not deleted:
+            print(f"[SNAPSHOT] Dropped manifest entry of missing snapshot {snapshot_id}")
+            return True
+        
         if deleted > 0:
             print(f"[SNAPSHOT] Deleted {deleted} files for snapshot {snapshot_id}")
         else:
@@ -187,14 +620,27 @@ class BlockchainSnapshot:
         return deleted > 0
     
     def cleanup_old_snapshots(self, keep_last=5):
-        """Clean up old snapshots, keeping only the N most recent"""
+        """
+        Clean up old snapshots, keeping only the N most recent
+        
+        Parents of a kept delta snapshot are kept as well, since it cannot
+        be restored without them.
+        """
         snapshots = self.list_snapshots()
         
         if len(snapshots) <= keep_last:
             print(f"[SNAPSHOT] No cleanup needed. Have {len(snapshots)}, keeping {keep_last}")
             return 0
         
-        to_delete = snapshots[:-keep_last]  # All except last N
+        needed = set()
+        for snapshot in snapshots[-keep_last:] if keep_last else []:
+            snapshot_id = snapshot["id"]
+            while snapshot_id and snapshot_id not in needed:
+                needed.add(snapshot_id)
+                entry = self.manifest.get(snapshot_id) or {}
+                snapshot_id = entry.get("parent")
+        
+        to_delete = [s for s in snapshots[:-keep_last or None] if s["id"] not in needed]
         deleted_count = 0
         
         for snapshot in to_delete:
@@ -294,16 +740,108 @@ def test_snapshot():
     if loaded:
         print(f"Loaded snapshot ID: {loaded['id']}")
         print(f"Block count: {len(loaded['blockchain_data'])}")
+    assert loaded["blockchain_data"] == test_blockchain
+    assert loaded["checksum"] == snapshot["checksum"]
+    assert snapshot_mgr.verify_snapshot(snapshot["id"])
+    
+    # Chunks are compressed independently; force several with a tiny chunk size
+    chunked_mgr = BlockchainSnapshot("test_snapshots", codec="lzma", workers=4, chunk_size=64)
+    chunked = chunked_mgr.create_snapshot(test_blockchain, metadata, delta=False)
+    assert chunked_mgr.verify_snapshot(chunked["id"])
+    assert snapshot_mgr.load_snapshot(chunked["id"])["blockchain_data"] == test_blockchain
+    
+    # Delta snapshots store only what changed since the previous one
+    print("\n4. Creating delta snapshots...")
+    test_blockchain = test_blockchain + [
+        {"block_id": f"block_{i:03d}", "transactions": [f"tx{i}"], "timestamp": "2024-01-01T01:00:00"}
+        for i in range(4, 6)
+    ]
+    delta = snapshot_mgr.create_snapshot(test_blockchain, metadata)
+    assert delta["kind"] == "delta" and delta["parent"] == chunked["id"]
+    assert [b["block_id"] for b in delta["delta"]["blocks"]] == ["block_004", "block_005"]
+    assert snapshot_mgr.load_snapshot(delta["id"])["blockchain_data"] == test_blockchain
+    
+    state = {"chain": list(test_blockchain), "balances": {"alice": 10, "bob": 5}, "height": 5}
+    full = snapshot_mgr.create_snapshot(state, metadata, delta=False)
+    assert full["kind"] == "full"
+    state["chain"].append({"block_id": "block_006", "transactions": [], "timestamp": "2024-01-01T02:00:00"})
+    state["height"] = 6
+    delta = snapshot_mgr.create_snapshot(state, metadata)
+    assert delta["kind"] == "delta" and set(delta["delta"]["state_set"]) == {"height"}
+    assert snapshot_mgr.load_snapshot()["blockchain_data"] == state
+    
+    # Random-access archives decode only the blocks that are read
+    print("\n5. Random-access snapshots...")
+    from core.chain import Blockchain
+    from core.transaction import Transaction
+    chain = Blockchain()
+    for i in range(20):
+        chain.add_block([Transaction(f"addr_{i}", f"addr_{i + 1}", i)])
+    archive_mgr = BlockchainSnapshot("test_snapshots", random_access=True)
+    archive_mgr.create_snapshot(list(chain.chain), metadata, delta=False)
+    chain.add_block([Transaction("addr_20", "addr_21", 20)])
+    tip = archive_mgr.create_snapshot(list(chain.chain), metadata)
+    assert tip["kind"] == "delta" and archive_mgr.verify_snapshot(tip["id"])
+    with archive_mgr.open_snapshot(tip["id"]) as view:
+        assert len(view) == len(chain.chain)
+        assert view[7].hash == chain.chain[7].hash
+        assert view[-1].transactions == chain.chain[-1].transactions
+        assert [block.hash for block in view] == [block.hash for block in chain.chain]
+    restored = archive_mgr.load_snapshot(tip["id"])["blockchain_data"]
+    assert [block.hash for block in restored] == [block.hash for block in chain.chain]
+    # A truncated archive is rejected when opened, not read past its end
+    with open(archive_mgr._find_file(tip["id"]), "rb") as f:
+        data = f.read()
+    truncated = os.path.join("test_snapshots", "truncated.blocks.tmp")
+    for cut in (3, len(data) // 2):
+        with open(truncated, "wb") as f:
+            f.write(data[:-cut])
+        try:
+            SnapshotArchive(truncated)
+            raise AssertionError("truncated archive opened")
+        except ValueError:
+            pass
+    os.remove(truncated)
+    
+    # The manifest answers listings without scanning the directory
+    latest = snapshot_mgr.latest_snapshot()
+    assert latest["id"] == tip["id"] and latest["parent"] is not None
+    assert latest["height_range"] == [21, 21] and latest["block_count"] == len(chain.chain)
+    listed = [entry["id"] for entry in BlockchainSnapshot("test_snapshots").list_snapshots()]
+    os.remove(snapshot_mgr.manifest.path)
+    assert snapshot_mgr.rebuild_manifest() == len(listed)
+    assert [entry["id"] for entry in snapshot_mgr.list_snapshots()] == listed
+    # An unreadable manifest is rebuilt rather than failing every listing
+    with open(snapshot_mgr.manifest.path, "w") as f:
+        f.write('{"snapshots": [')
+    assert [entry["id"] for entry in BlockchainSnapshot("test_snapshots").list_snapshots()] == listed
+    
+    # Managers in other processes add concurrently without losing entries
+    import subprocess
+    import sys
+    script = ("import contextlib, io; from core.snapshot import BlockchainSnapshot\n"
+              "with contextlib.redirect_stdout(io.StringIO()):\n"
+              "    manager = BlockchainSnapshot('test_snapshots')\n"
+              "    for i in range(5): manager.create_snapshot([{'index': i}], delta=False)\n")
+    writers = [subprocess.Popen([sys.executable, "-c", script]) for _ in range(3)]
+    assert all(writer.wait() == 0 for writer in writers)
+    files = {name.split('.')[0] for name in os.listdir("test_snapshots") if name.endswith(EXTENSIONS)}
+    assert {entry["id"] for entry in snapshot_mgr.list_snapshots()} == files
+    assert len(files) == len(listed) + 15
+    for snapshot_id in files - set(listed):
+        snapshot_mgr.delete_snapshot(snapshot_id)
     
     # Get statistics
-    print("\n4. Snapshot statistics...")
+    print("\n6. Snapshot statistics...")
     stats = snapshot_mgr.get_snapshot_stats()
     for key, value in stats.items():
         print(f"{key}: {value}")
     
-    # Cleanup (keep only 1 for testing)
-    print("\n5. Cleaning up old snapshots...")
+    # Cleanup (keep only 1 for testing); its base survives with it
+    print("\n7. Cleaning up old snapshots...")
     snapshot_mgr.cleanup_old_snapshots(keep_last=1)
+    restored = snapshot_mgr.load_snapshot(tip["id"])["blockchain_data"]
+    assert [block.hash for block in restored] == [block.hash for block in chain.chain]
     
     print("\n✅ Snapshot test completed!")
 
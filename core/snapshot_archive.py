@@ -0,0 +1,224 @@
+# core/snapshot_archive.py
+
+import bisect
+import mmap
+import pickle
+import struct
+from array import array
+
+from core.codec import decode_block, encode_block
+from core.snapshot_container import CODECS
+
+ARCHIVE_MAGIC = b"ASSN"
+# magic, version
+ARCHIVE_HEADER = struct.Struct(">4sI")
+ARCHIVE_VERSION = 1
+# block count, offset table position, header record position and length, magic
+ARCHIVE_FOOTER = struct.Struct(">QQQI4s")
+# record offset, record length
+ARCHIVE_ENTRY = struct.Struct(">QI")
+
+# Record kinds (first byte of a record)
+RECORD_PICKLE = 0
+RECORD_CODEC = 1    # core.codec block
+RECORD_COMPRESSED = 0x80  # flag: the rest of the record is compressed with the archive codec
+
+
+def _codec_block_types():
+    from core import block as simple
+    from core import blockchain as pow_chain
+
+    return simple.Block, pow_chain.Block
+
+
+def write_archive(f, header, blocks, codec=None, level=None):
+    """
+    Write a snapshot header and its blocks as independently decodable records
+
+    Blocks of the chain classes are stored in the core.codec binary form,
+    anything else is pickled on its own. With a codec every record is
+    compressed separately, so reading one block never touches its
+    neighbours. A fixed-width offset table and a footer pointing at it
+    follow the records. Only the offsets (12 bytes per block) are held in
+    memory. Returns the number of bytes written.
+    """
+    compress = CODECS[codec][0] if codec else None
+    if compress and level is None:
+        level = CODECS[codec][2]
+    codec_types = _codec_block_types()
+
+    position = 0
+
+    def emit(data):
+        nonlocal position
+        f.write(data)
+        position += len(data)
+
+    emit(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION))
+    meta = pickle.dumps(dict(header, archive_codec=codec), protocol=pickle.HIGHEST_PROTOCOL)
+    meta_offset = position
+    emit(meta)
+
+    offsets, lengths = array("Q"), array("I")
+    for block in blocks:
+        if type(block) in codec_types:
+            kind, data = RECORD_CODEC, encode_block(block)
+        else:
+            kind, data = RECORD_PICKLE, pickle.dumps(block, protocol=pickle.HIGHEST_PROTOCOL)
+        if compress:
+            kind, data = kind | RECORD_COMPRESSED, compress(data, level)
+        offsets.append(position)
+        lengths.append(len(data) + 1)
+        emit(bytes((kind,)))
+        emit(data)
+
+    table_offset = position
+    for offset, length in zip(offsets, lengths):
+        emit(ARCHIVE_ENTRY.pack(offset, length))
+    emit(ARCHIVE_FOOTER.pack(len(offsets), table_offset, meta_offset, len(meta), ARCHIVE_MAGIC))
+    return position
+
+
+class SnapshotArchive:
+    """
+    Memory-mapped, random-access view of a write_archive() file
+
+    Opening reads only the footer and the header record; a file whose
+    footer does not match its size raises ValueError. Block N is one
+    offset-table lookup and one record decode; nothing else is read, so
+    len(), archive[n], slicing and iteration cost the same for any N.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        """Read the footer and header record, checking they describe this file"""
+        size = len(self._view)
+        if size < ARCHIVE_HEADER.size + ARCHIVE_FOOTER.size:
+            raise ValueError(f"{self.filename} is not a snapshot archive")
+        magic, version = ARCHIVE_HEADER.unpack_from(self._view, 0)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{self.filename} is not a snapshot archive")
+        footer = size - ARCHIVE_FOOTER.size
+        self.count, self._table, meta_offset, meta_length, magic = ARCHIVE_FOOTER.unpack_from(
+            self._view, footer)
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"{self.filename} has no archive footer (truncated?)")
+        if (self._table + self.count * ARCHIVE_ENTRY.size != footer
+                or not ARCHIVE_HEADER.size <= meta_offset <= meta_offset + meta_length <= self._table):
+            raise ValueError(f"{self.filename} has an inconsistent archive footer")
+        self.header = pickle.loads(self._view[meta_offset:meta_offset + meta_length])
+        codec = self.header.pop("archive_codec")
+        self._decompress = CODECS[codec][1] if codec else None
+
+    def get(self, n):
+        offset, length = ARCHIVE_ENTRY.unpack_from(self._view, self._table + n * ARCHIVE_ENTRY.size)
+        # Records lie between the header and the offset table
+        if not (ARCHIVE_HEADER.size <= offset and 1 <= length and offset + length <= self._table):
+            raise ValueError(f"{self.filename}: block {n} points outside the archive")
+        kind = self._view[offset]
+        data = self._view[offset + 1:offset + length]
+        if kind & RECORD_COMPRESSED:
+            data = memoryview(self._decompress(data))
+        if kind & ~RECORD_COMPRESSED == RECORD_CODEC:
+            return decode_block(data)
+        return pickle.loads(data)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self.get(i) for i in range(*n.indices(self.count))]
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError("block number out of range")
+        return self.get(n)
+
+    def __iter__(self):
+        for n in range(self.count):
+            yield self.get(n)
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnapshotView:
+    """
+    Blocks and state of a snapshot across its delta chain, read lazily
+
+    `links` are (header, blocks) pairs from the requested snapshot back to
+    its full base; blocks is a SnapshotArchive or a plain list. Each delta
+    cuts the chain at its `blocks_from` and appends its own blocks, so the
+    view is a handful of (start, count, source) segments and block N is a
+    bisect plus one record read. State is replayed from the headers alone.
+    """
+
+    def __init__(self, links):
+        self.links = links
+        self.snapshot = links[0][0]
+        base, source = links[-1]
+        self.segments = [(0, len(source), source)]
+        data, key = base["blockchain_data"], base.get("state_key")
+        self.state = {k: v for k, v in data.items() if k != key} if key else None
+        for header, source in reversed(links[:-1]):
+            delta = header["delta"]
+            cut = delta["blocks_from"]
+            self.segments = [(start, min(count, cut - start), blocks)
+                             for start, count, blocks in self.segments if start < cut]
+            self.segments.append((cut, len(source), source))
+            if self.state is not None:
+                for name in delta["state_removed"]:
+                    self.state.pop(name, None)
+                self.state.update(delta["state_set"])
+        self.starts = [start for start, _, _ in self.segments]
+        start, count, _ = self.segments[-1]
+        self.count = start + count
+
+    def get(self, n):
+        start, _, blocks = self.segments[bisect.bisect_right(self.starts, n) - 1]
+        return blocks[n - start]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self.get(i) for i in range(*n.indices(self.count))]
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError("block number out of range")
+        return self.get(n)
+
+    def __iter__(self):
+        for n in range(self.count):
+            yield self.get(n)
+
+    def close(self):
+        for _, blocks in self.links:
+            if isinstance(blocks, SnapshotArchive):
+                blocks.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,189 @@
+# core/snapshot_container.py
+
+import hashlib
+import json
+import lzma
+import os
+import struct
+import zlib
+from collections import deque
+
+MAGIC = b"BCSNAP01"
+FOOTER = struct.Struct("<QQ8s")     # index offset, index length, magic
+CHUNK_SIZE = 1 << 20
+
+# name -> (compress(data, level), decompress(data), default level)
+CODECS = {
+    "zlib": (lambda data, level: zlib.compress(data, level), zlib.decompress, 6),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress, 1),
+}
+
+
+class ChunkedWriter:
+    """
+    File-like writer that compresses fixed-size chunks in a thread pool
+
+    Bytes written are cut into `chunk_size` pieces; each piece is
+    compressed by a worker (zlib and lzma release the GIL while they run)
+    and appended to the file in order. At most `max_pending` chunks are in
+    flight, so memory stays at a few chunks per worker. close() writes a
+    JSON chunk index and a fixed-size footer pointing at it. `hash` covers
+    every byte of the file.
+    """
+
+    def __init__(self, f, executor, codec="zlib", level=None, chunk_size=CHUNK_SIZE, max_pending=8):
+        self.f = f
+        self.executor = executor
+        self.codec = codec
+        self.compress = CODECS[codec][0]
+        self.level = CODECS[codec][2] if level is None else level
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.chunks = []
+        self.hash = hashlib.sha256()
+        self.offset = 0
+        self.size = 0       # uncompressed bytes written
+        self._emit(MAGIC)
+
+    def _emit(self, data):
+        self.f.write(data)
+        self.hash.update(data)
+        self.offset += len(data)
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        while len(self.buffer) >= self.chunk_size:
+            self._submit(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def _submit(self, chunk):
+        self.pending.append((self.executor.submit(self.compress, chunk, self.level), len(chunk)))
+        while len(self.pending) > self.max_pending:
+            self._collect()
+
+    def _collect(self):
+        future, raw_length = self.pending.popleft()
+        data = future.result()
+        self.chunks.append((self.offset, len(data), raw_length))
+        self._emit(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self._collect()
+        index = json.dumps({
+            "codec": self.codec,
+            "level": self.level,
+            "chunk_size": self.chunk_size,
+            "chunks": self.chunks
+        }).encode()
+        index_offset = self.offset
+        self._emit(index)
+        self._emit(FOOTER.pack(index_offset, len(index), MAGIC))
+
+
+def read_index(f):
+    """Chunk index of a container file"""
+    f.seek(-FOOTER.size, os.SEEK_END)
+    index_offset, index_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != MAGIC:
+        raise ValueError("not a chunked snapshot file")
+    f.seek(index_offset)
+    return json.loads(f.read(index_length))
+
+
+class ChunkedReader:
+    """
+    File-like reader over a ChunkedWriter file
+
+    Compressed chunks are read in file order and handed to the thread pool
+    up to `prefetch` ahead of the consumer, so decompression of the next
+    chunks overlaps with unpickling of the current one. The whole file is
+    hashed on the way; digest() returns the sha256 once the consumer is
+    done.
+    """
+
+    def __init__(self, f, executor, prefetch=8):
+        self.f = f
+        self.executor = executor
+        self.prefetch = prefetch
+        self.index = read_index(f)
+        self.decompress = CODECS[self.index["codec"]][1]
+        self.hash = hashlib.sha256()
+        f.seek(0)
+        self._take(len(MAGIC))
+        self.next_chunk = 0
+        self.pending = deque()
+        self.current = b""
+        self.pos = 0
+
+    def _take(self, size):
+        data = self.f.read(size)
+        self.hash.update(data)
+        return data
+
+    def _fill(self):
+        """Make the next decompressed chunk current; False at the end"""
+        chunks = self.index["chunks"]
+        while self.next_chunk < len(chunks) and len(self.pending) < self.prefetch:
+            _, length, _ = chunks[self.next_chunk]
+            self.pending.append(self.executor.submit(self.decompress, self._take(length)))
+            self.next_chunk += 1
+        if not self.pending:
+            return False
+        self.current = self.pending.popleft().result()
+        self.pos = 0
+        return True
+
+    def read(self, size=-1):
+        parts = []
+        while size:
+            if self.pos == len(self.current) and not self._fill():
+                break
+            end = len(self.current) if size < 0 else min(len(self.current), self.pos + size)
+            parts.append(self.current[self.pos:end])
+            if size > 0:
+                size -= end - self.pos
+            self.pos = end
+        return b"".join(parts)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        parts = []
+        while size:
+            if self.pos == len(self.current) and not self._fill():
+                break
+            newline = self.current.find(b"\n", self.pos)
+            end = len(self.current) if newline < 0 else newline + 1
+            if size > 0:
+                end = min(end, self.pos + size)
+                size -= end - self.pos
+            parts.append(self.current[self.pos:end])
+            self.pos = end
+            if parts[-1].endswith(b"\n"):
+                break
+        return b"".join(parts)
+
+    def digest(self):
+        """sha256 of the file, reading whatever the consumer left"""
+        while self.pending:
+            self.pending.popleft().result()
+        for _, length, _ in self.index["chunks"][self.next_chunk:]:
+            self._take(length)
+        self.next_chunk = len(self.index["chunks"])
+        while self._take(CHUNK_SIZE):
+            pass
+        return self.hash.hexdigest()
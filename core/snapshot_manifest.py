@@ -0,0 +1,152 @@
+# core/snapshot_manifest.py
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "manifest.lock"
+
+
+class SnapshotManifest:
+    """
+    Catalog of the snapshots in a directory, oldest first
+
+    One entry per snapshot (id, file, kind, parent, height range, sizes,
+    checksum, codec) kept in memory and in `manifest.json`, rewritten
+    atomically (unique temp file + rename) on every change. Listing and
+    finding the latest snapshot never touch the snapshot files. Another
+    manager writing the same directory replaces the file, which changes
+    its inode, so refresh() reloads with a single stat.
+
+    Changes hold an flock on `manifest.lock` around refresh, modify and
+    save, so managers in other processes never overwrite each other's
+    entries. A manifest that cannot be parsed is handed to `rebuild`
+    (which recreates it from the directory) when one is given.
+    """
+
+    def __init__(self, snapshot_dir, rebuild=None):
+        self.snapshot_dir = snapshot_dir
+        self.path = os.path.join(snapshot_dir, MANIFEST_FILE)
+        self.lock_path = os.path.join(snapshot_dir, LOCK_FILE)
+        self.rebuild = rebuild
+        self.lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self.entries = []
+        self.by_id = {}
+        self._stamp = None
+        # Loaded on first use, so `rebuild` may refer to the owner of this manifest
+        self.exists = os.path.exists(self.path)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Exclusive across threads and, where flock exists, across processes"""
+        with self.lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.lock_path, "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _stat(self):
+        try:
+            stats = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stats.st_ino, stats.st_mtime_ns, stats.st_size
+
+    def _load(self):
+        stamp = self._stat()
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)["snapshots"]
+        except (ValueError, KeyError, TypeError):
+            if self.rebuild is None:
+                raise
+            print(f"[SNAPSHOT] Unreadable manifest {self.path}, rebuilding it")
+            # Skip this file version while the rebuild replaces it
+            self._stamp = stamp
+            self.rebuild()
+            return
+        self._replace(entries)
+        self._stamp = stamp
+
+    def _replace(self, entries):
+        self.entries = entries
+        self.by_id = {entry["id"]: entry for entry in entries}
+
+    def refresh(self):
+        with self.lock:
+            stamp = self._stat()
+            if stamp is not None and stamp != self._stamp:
+                self._load()
+
+    def save(self):
+        with self.lock:
+            fd, temp = tempfile.mkstemp(prefix=MANIFEST_FILE + ".", suffix=".tmp", dir=self.snapshot_dir)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"snapshots": self.entries}, f, indent=1)
+                os.replace(temp, self.path)
+            except BaseException:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(temp)
+                raise
+            self._stamp = self._stat()
+            self.exists = True
+
+    def reset(self, entries):
+        """Replace every entry (used when rebuilding from the directory)"""
+        with self.locked():
+            self._replace(list(entries))
+            self.save()
+
+    def add(self, entry):
+        with self.locked():
+            self.refresh()
+            previous = self.by_id.get(entry["id"])
+            if previous is not None:
+                self.entries.remove(previous)
+            self.entries.append(entry)
+            self.by_id[entry["id"]] = entry
+            self.save()
+
+    def remove(self, snapshot_id):
+        with self.locked():
+            self.refresh()
+            entry = self.by_id.pop(snapshot_id, None)
+            if entry is not None:
+                self.entries.remove(entry)
+                self.save()
+            return entry
+
+    def get(self, snapshot_id):
+        self.refresh()
+        return self.by_id.get(snapshot_id)
+
+    def latest(self):
+        self.refresh()
+        return self.entries[-1] if self.entries else None
+
+    def __len__(self):
+        self.refresh()
+        return len(self.entries)
+
+    def __iter__(self):
+        self.refresh()
+        return iter(list(self.entries))
@@ -1,10 +1,74 @@
+import hashlib
 import time
-import uuid
+
+# Version byte of the canonical encoding that tx ids are hashed from
+TX_ID_VERSION = 1
 
 class Transaction:
-    def __init__(self, sender, receiver, amount):
+    """
+    Payment record with a content-addressed id
+
+    tx_id is the sha256 of the canonical encoding of the payment, computed
+    on first access and cached, so every node derives the same id for the
+    same payment. Treat a transaction as immutable once created.
+    """
+    __slots__ = ('sender', 'receiver', 'amount', 'timestamp', '_tx_id')
+
+    def __init__(self, sender, receiver, amount, timestamp=None):
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
-        self.timestamp = time.time()
-        self.tx_id = str(uuid.uuid4())
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._tx_id = None
+
+    @classmethod
+    def restore(cls, sender, receiver, amount, timestamp, tx_id=None):
+        """Rebuild a decoded transaction (tx_id only for legacy, non-derived ids)"""
+        tx = cls.__new__(cls)
+        tx.sender = sender
+        tx.receiver = receiver
+        tx.amount = amount
+        tx.timestamp = timestamp
+        tx._tx_id = tx_id
+        return tx
+
+    def canonical_bytes(self):
+        from core.codec import write_str, write_value
+
+        out = bytearray([TX_ID_VERSION])
+        write_str(out, str(self.sender))
+        write_str(out, str(self.receiver))
+        write_value(out, self.amount)
+        write_value(out, self.timestamp)
+        return bytes(out)
+
+    @property
+    def tx_id(self):
+        if self._tx_id is None:
+            self._tx_id = hashlib.sha256(self.canonical_bytes()).hexdigest()
+        return self._tx_id
+
+    @property
+    def content_addressed(self):
+        """False for transactions restored with a legacy (uuid) id"""
+        return self._tx_id is None or len(self._tx_id) == 64
+
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return self.tx_id == other.tx_id
+
+    def __hash__(self):
+        return hash(self.tx_id)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = state[1] or {}
+        # Pickles made before __slots__ stored a random uuid as tx_id
+        state = dict(state)
+        state.setdefault('_tx_id', state.pop('tx_id', None))
+        for name in self.__slots__:
+            setattr(self, name, state.get(name))
@@ -20,22 +20,23 @@ def cli():
             print(f"Transaction added: {tx.tx_id}")
 
         elif cmd == "mine":
-            if not mempool.transactions:
+            if not len(mempool):
                 print("No transactions to mine.")
                 continue
-            risk, bot = ai.analyze_block(mempool.transactions)
+            txs = list(mempool.by_id.values())
+            risk, bot = ai.analyze_block(txs)
             print(f"Average risk: {risk:.2f}")
             print(f"Bot detected: {bot}")
             if not bot and ai.filter.approve_block(risk):
-                chain.add_block(mempool.transactions)
-                mempool.clear()
+                chain.add_block(txs)
+                mempool.remove_transactions(txs)
                 print("Block mined successfully!")
             else:
                 print("Block rejected by AI.")
 
         elif cmd == "status":
             print(f"Chain length: {len(chain.chain)}")
-            print(f"Mempool size: {len(mempool.transactions)}")
+            print(f"Mempool size: {len(mempool)}")
 
         elif cmd == "exit":
             print("Exiting...")
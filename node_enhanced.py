@@ -12,6 +12,11 @@ from datetime import datetime
 # Додади го интегрираниот систем
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from core.blockchain import Blockchain
+from core.mining import MiningJob
+from core.priority_mempool import PriorityMempool
+from core.block_template import BlockTemplateBuilder
+
 class EnhancedNode:
     """Подобрена верзија на Node со Phase 1 модули"""
     
@@ -21,6 +26,10 @@ class EnhancedNode:
         self.start_time = time.time()
         self.transactions = []
         self.blocks = []
+        self.chain = Blockchain()
+        self.mining_job = None
+        self.mempool = PriorityMempool(verbose=False)
+        self.block_template = BlockTemplateBuilder(self.mempool)
         
         # Иницијализирај го интегрираниот систем
         print(f"🚀 Иницијализирам Enhanced Node {node_id}...")
@@ -53,12 +62,14 @@ class EnhancedNode:
             is_valid, message = self.enhanced_system.validate_transaction(tx_data)
             
             if is_valid:
-                self.transactions.append({
+                tx = {
                     **tx_data,
                     'validated_by': 'enhanced_system',
                     'timestamp': time.time(),
                     'node_id': self.node_id
-                })
+                }
+                self.transactions.append(tx)
+                self.mempool.add_tx(tx, fee=tx_data.get('fee', 0))
                 print(f"✅ Трансакцијата е валидна: {message}")
                 return True
             else:
@@ -68,6 +79,7 @@ class EnhancedNode:
             # Основна валидација
             if all(k in tx_data for k in ['from', 'to', 'amount']):
                 self.transactions.append(tx_data)
+                self.mempool.add_tx(tx_data, fee=tx_data.get('fee', 0))
                 print("✅ Трансакцијата е прифатена (basic validation)")
                 return True
             else:
@@ -106,6 +118,37 @@ class EnhancedNode:
             print("⚠️ Enhanced систем не е достапен, користам basic договор")
             return {'id': contract_id, 'type': 'basic', 'code': contract_code}
     
+    def _proof_of_work(self, transactions):
+        """Изврши прекинлив mining job; cancel_mining() или блок од друг јазол го прекинуваат"""
+        self.mining_job = MiningJob(self.chain, transactions).start()
+        pow_block = self.mining_job.wait()
+        self.mining_job = None
+        return pow_block
+    
+    def update_mining_template(self, transactions):
+        """Продолжи го тековното копање со нов сет трансакции"""
+        if self.mining_job:
+            self.mining_job.update_template(transactions)
+    
+    def cancel_mining(self):
+        """Прекини го тековното копање"""
+        if self.mining_job:
+            self.mining_job.cancel()
+    
+    def receive_block(self, block):
+        """Прифати блок од друг јазол; тековното копање продолжува на новиот врв"""
+        if not self.chain.add_block(block):
+            return False
+        self.mempool.remove_confirmed(block.transactions)
+        # Нов врв: копај го она што останало во mempool, без потврдените трансакции
+        job = self.mining_job
+        if job and job.running:
+            if len(self.mempool):
+                job.update_template(self.block_template.get_template())
+            else:
+                job.cancel()
+        return True
+    
     def mine_block(self, transactions=None, mining_power=500):
         """Ископaj блок со green mining оптимизација"""
         print(f"\n⛏️  Копање блок на Node {self.node_id}")
@@ -114,14 +157,26 @@ class EnhancedNode:
             # Оптимизирај mining
             mining_result = self.enhanced_system.optimize_mining_operation(mining_power, 'medium')
             
+            block_txs = transactions or self.block_template.get_template()  # Најдобри трансакции по провизија/бајт
+            pow_block = self._proof_of_work(block_txs)
+            if pow_block is None:
+                print("⚠️ Копањето е прекинато")
+                return None
+            # Шаблонот можел да се смени за време на копањето; важат ископаните трансакции
+            block_txs = pow_block.transactions
+            self.mempool.remove_confirmed(block_txs)
+            
             # Креирај блок
             new_block = {
                 'block_id': f"block_{int(time.time())}_{self.node_id}",
                 'timestamp': time.time(),
                 'miner': self.node_id,
-                'transactions': transactions or self.transactions[-10:],  # Последни 10 трансакции
+                'transactions': block_txs,
+                'hash': pow_block.hash,
+                'previous_hash': pow_block.previous_hash,
+                'nonce': pow_block.nonce,
                 'mining_stats': mining_result,
-                'size': len(json.dumps(transactions or [])) if transactions else 0
+                'size': len(json.dumps(block_txs, default=str)) if block_txs else 0
             }
             
             self.blocks.append(new_block)
@@ -134,11 +189,23 @@ class EnhancedNode:
             return new_block
         else:
             # Basic mining
+            block_txs = transactions or self.block_template.get_template()
+            pow_block = self._proof_of_work(block_txs)
+            if pow_block is None:
+                print("⚠️ Копањето е прекинато")
+                return None
+            # Шаблонот можел да се смени за време на копањето; важат ископаните трансакции
+            block_txs = pow_block.transactions
+            self.mempool.remove_confirmed(block_txs)
+            
             new_block = {
                 'block_id': f"block_{int(time.time())}_{self.node_id}",
                 'timestamp': time.time(),
                 'miner': self.node_id,
-                'transactions': transactions or []
+                'transactions': block_txs,
+                'hash': pow_block.hash,
+                'previous_hash': pow_block.previous_hash,
+                'nonce': pow_block.nonce
             }
             
             self.blocks.append(new_block)
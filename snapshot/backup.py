@@ -2,19 +2,28 @@
 
 import pickle
 
-def save_snapshot(chain, filename="snapshot.pkl"):
+from core.codec import is_chain, read_chain, write_chain
+
+def save_snapshot(chain, filename="snapshot.pkl", binary=False):
     """
     Направи snapshot на целата мрежа за backup.
     Поддржува или chain објект со .chain атрибут или директно податоци.
+    Со binary=True блоковите се запишуваат со core.codec наместо pickle.
     """
     # Ако chain има .chain атрибут, користи го, инаку користи го директно
     data = chain.chain if hasattr(chain, 'chain') else chain
     with open(filename, "wb") as f:
-        pickle.dump(data, f)
+        if binary:
+            write_chain(f, data)
+        else:
+            pickle.dump(data, f)
 
 def load_snapshot(filename="snapshot.pkl"):
     """
-    Вчитај snapshot од фајл.
+    Вчитај snapshot од фајл (бинарен или pickle формат).
     """
     with open(filename, "rb") as f:
-        return pickle.load(f)
+        data = f.read()
+    if is_chain(data):
+        return read_chain(data)
+    return pickle.loads(data)
@@ -23,11 +23,12 @@ for mempool in mempools:
 
 # Analyze and mine
 for i, mempool in enumerate(mempools):
-    risk, bot = ai.analyze_block(mempool.transactions)
+    txs = mempool.transactions
+    risk, bot = ai.analyze_block(txs)
     print(f"Node {i} -> Risk: {risk:.2f}, Bot detected: {bot}")
     if not bot and ai.filter.approve_block(risk):
-        chain.add_block(mempool.transactions)
-        mempool.clear()
+        chain.add_block(txs)
+        mempool.remove_transactions(txs)
         print(f"Node {i}: Block mined successfully!")
     else:
         print(f"Node {i}: Block rejected.")